@@ -0,0 +1,17 @@
+"""
+Benchmarks for crudwrapper, run against an in-memory SQLite database with
+the sample models in benchmarks.models.
+"""
+import os
+
+
+def setup():
+    """
+    Configure Django with benchmarks.settings and create the tables.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command('migrate', run_syncdb=True, verbosity=0)
@@ -0,0 +1,67 @@
+"""
+Measure the cold start cost of crudwrapper, each sample in a fresh
+interpreter. The time runs from interpreter start, so it includes
+django.setup() and what CrudwrapperConfig.ready() imports, up to the
+imported modules.
+
+    python -m benchmarks.bench_import [repeat]
+
+The heavy column lists the form and view libraries already imported at that
+point. The deferred row is the import time of the modules crudwrapper.views
+no longer imports up front, paid on the first delete confirmation page instead.
+"""
+import json
+import statistics
+import subprocess
+import sys
+
+
+SAMPLE = """
+import time
+start = time.perf_counter()
+import json, os, sys
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+import django
+django.setup()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'modules': len(sys.modules),
+                  'heavy': sorted(name for name in {heavy!r} if name in sys.modules),
+                  'admin': 'django.contrib.admin' in sys.modules}}))
+"""
+
+# imported by crudwrapper.forms and crudwrapper.views, not needed to set up Django.
+HEAVY = ('braces.views', 'crispy_forms.helper', 'extra_views', 'vanilla')
+
+TARGETS = (
+    ('django.setup()', ()),
+    ('crudwrapper.views', ('crudwrapper.views', )),
+    ('crudwrapper (all modules)', ('crudwrapper.views', 'crudwrapper.mixins', 'crudwrapper.jobs',
+                                   'crudwrapper.instrumentation', 'crudwrapper.rendering')),
+    ('deferred: admin.utils', ('crudwrapper.views', 'django.contrib.admin.utils')),
+)
+
+
+def sample(modules):
+    output = subprocess.check_output([sys.executable, '-c', SAMPLE.format(modules=modules, heavy=HEAVY)])
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def main(repeat=10):
+    results = {}
+    for name, modules in TARGETS:
+        samples = [sample(modules) for attempt in range(repeat)]
+        results[name] = {
+            'ms': statistics.median(s['seconds'] for s in samples) * 1000,
+            'modules': samples[-1]['modules'],
+            'heavy': ', '.join(samples[-1]['heavy']) or '-',
+            'admin': samples[-1]['admin'],
+        }
+        print('{:<28} {ms:>8.1f} ms {modules:>5d} modules  admin: {admin!s:<5}  heavy: {heavy}'.format(
+            name, **results[name]))
+    return results
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,45 @@
+"""
+Compare {% crispy formset helper %} with the crudwrapper render cache.
+
+    python -m benchmarks.bench_render_cache [rows]
+"""
+import sys
+import timeit
+
+from benchmarks import setup
+
+
+EMPLOYEE_FIELDS = ('name', 'email', 'hired', 'salary', 'active')
+
+
+def main(rows=500, repeat=5):
+    from django.forms.models import modelformset_factory
+    from django.template import Context, Template
+
+    from crudwrapper.forms import CrispyModelForm, CrispyFormSetHelper
+    from benchmarks.data import make_company
+    from benchmarks.models import Employee
+
+    make_company(departments=1, employees=rows)
+    formset_class = modelformset_factory(Employee, form=CrispyModelForm, fields=EMPLOYEE_FIELDS, extra=0)
+    helper = CrispyFormSetHelper()
+    templates = (
+        ('crispy', Template('{% load crispy_forms_tags %}{% crispy formset helper %}')),
+        ('crispy_cached', Template('{% load crudwrapper_tags %}{% crispy_cached formset helper %}')),
+    )
+
+    results = {}
+    for name, template in templates:
+        def render():
+            formset = formset_class(queryset=Employee.objects.all())
+            template.render(Context({'formset': formset, 'helper': helper}))
+        render()  # warm up the template loaders and the render cache.
+        results[name] = min(timeit.repeat(render, number=1, repeat=repeat))
+        print('{:<14} {:>8.1f} ms'.format(name, results[name] * 1000))
+    print('speedup        {:>8.2f}x'.format(results['crispy'] / results['crispy_cached']))
+    return results
+
+
+if __name__ == '__main__':
+    setup()
+    main(*[int(arg) for arg in sys.argv[1:2]])
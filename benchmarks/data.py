@@ -0,0 +1,28 @@
+import datetime
+from decimal import Decimal
+
+from .models import Company, Department, Employee, Task
+
+
+def make_company(departments=2, employees=10, tasks=0, name='ACME'):
+    """
+    Create a company with departments, employees per department and tasks
+    per employee. Returns the company.
+    """
+    company = Company.objects.create(name=name)
+    hired = datetime.date(2020, 1, 1)
+    for d in range(departments):
+        department = Department.objects.create(company=company, name='Department {}'.format(d))
+        Employee.objects.bulk_create([
+            Employee(department=department, name='Employee {}-{}'.format(d, e),
+                     email='employee{}-{}@example.com'.format(d, e),
+                     hired=hired + datetime.timedelta(days=e), salary=Decimal('1000.00') + e)
+            for e in range(employees)
+        ])
+    if tasks:
+        Task.objects.bulk_create([
+            Task(employee=employee, title='Task {}'.format(t), due=hired + datetime.timedelta(days=t))
+            for employee in Employee.objects.filter(department__company=company)
+            for t in range(tasks)
+        ])
+    return company
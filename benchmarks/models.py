@@ -0,0 +1,42 @@
+from django.db import models
+
+
+class Company(models.Model):
+    name = models.CharField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.name
+
+
+class Department(models.Model):
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='departments')
+    name = models.CharField(max_length=100)
+
+    def __str__(self):
+        return self.name
+
+
+class Employee(models.Model):
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='employees')
+    manager = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL)
+    name = models.CharField(max_length=100)
+    email = models.EmailField()
+    hired = models.DateField()
+    salary = models.DecimalField(max_digits=10, decimal_places=2)
+    active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
+
+class Task(models.Model):
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='tasks')
+    title = models.CharField(max_length=200)
+    due = models.DateField()
+    done = models.BooleanField(default=False)
+
+    def __str__(self):
+        return self.title
@@ -0,0 +1,275 @@
+"""
+Benchmark every crudwrapper view at several data sizes and compare the
+results with a stored baseline.
+
+    python -m benchmarks.run [--sizes 10,100,500] [--repeat 5]
+                             [--output bench_results.json]
+                             [--baseline benchmarks/baseline.json]
+                             [--save-baseline] [--tolerance 0.25]
+
+For every scenario the median request latency, the number of queries and
+the peak traced memory are recorded. Compared with the baseline, any extra
+query or a latency/memory increase above the tolerance is a regression and
+the run exits with status 1.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks import setup
+
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+PACKAGES = ('Django', 'django-crispy-forms', 'django-extra-views', 'django-vanilla-views', 'django-braces')
+
+
+def employee_data(department, index):
+    return {
+        'department': department.pk,
+        'name': 'New employee {}'.format(index),
+        'email': 'new{}@example.com'.format(index),
+        'hired': '2021-01-01',
+        'salary': '1500.00',
+        'active': 'on',
+    }
+
+
+def formset_data(prefix, employees, with_department=True, total=None):
+    data = {
+        '{}-TOTAL_FORMS'.format(prefix): total if total is not None else len(employees),
+        '{}-INITIAL_FORMS'.format(prefix): len(employees),
+        '{}-MIN_NUM_FORMS'.format(prefix): 0,
+        '{}-MAX_NUM_FORMS'.format(prefix): 1000,
+    }
+    for index, employee in enumerate(employees):
+        row = employee_data(employee.department, index)
+        row['id'] = employee.pk
+        if not with_department:
+            del row['department']
+        for name, value in row.items():
+            data['{}-{}-{}'.format(prefix, index, name)] = value
+    return data
+
+
+def create_scenario(method):
+    def scenario(size):
+        from benchmarks.data import make_company
+        make_company(departments=size, employees=1)
+        from benchmarks.models import Department
+        return method, '/employees/add/', employee_data(Department.objects.first(), 0)
+    return scenario
+
+
+def update_scenario(method):
+    def scenario(size):
+        from benchmarks.data import make_company
+        from benchmarks.models import Employee
+        make_company(departments=size, employees=1)
+        employee = Employee.objects.first()
+        return method, '/employees/{}/'.format(employee.pk), employee_data(employee.department, 0)
+    return scenario
+
+
+def delete_scenario(method):
+    def scenario(size):
+        from benchmarks.data import make_company
+        company = make_company(departments=5, employees=max(1, size // 5), tasks=3)
+        return method, '/companies/{}/delete/'.format(company.pk), {}
+    return scenario
+
+
+def formset_scenario(method):
+    def scenario(size):
+        from benchmarks.data import make_company
+        from benchmarks.models import Employee
+        make_company(departments=1, employees=size)
+        employees = list(Employee.objects.select_related('department').order_by('pk'))
+        return method, '/employees/', formset_data('form', employees)
+    return scenario
+
+
+def inline_create_scenario(method):
+    def scenario(size):
+        from benchmarks.data import make_company
+        from benchmarks.models import Department
+        company = make_company(departments=1, employees=0)
+        department = Department.objects.first()
+        data = {'company': company.pk, 'name': 'New department'}
+        data.update(formset_data('employees', [], with_department=False, total=size))
+        for index in range(size):
+            for name, value in employee_data(department, index).items():
+                if name != 'department':
+                    data['employees-{}-{}'.format(index, name)] = value
+        return method, '/departments/add/', data
+    return scenario
+
+
+def inline_update_scenario(method):
+    def scenario(size):
+        from benchmarks.data import make_company
+        from benchmarks.models import Department, Employee
+        company = make_company(departments=1, employees=size)
+        department = Department.objects.first()
+        employees = list(Employee.objects.select_related('department').order_by('pk'))
+        data = {'company': company.pk, 'name': 'Renamed department'}
+        data.update(formset_data('employees', employees, with_department=False))
+        return method, '/departments/{}/'.format(department.pk), data
+    return scenario
+
+
+SCENARIOS = [
+    ('create.get', create_scenario('get')),
+    ('create.post', create_scenario('post')),
+    ('update.get', update_scenario('get')),
+    ('update.post', update_scenario('post')),
+    ('delete.get', delete_scenario('get')),
+    ('delete.post', delete_scenario('post')),
+    ('formset.get', formset_scenario('get')),
+    ('formset.post', formset_scenario('post')),
+    ('inline_create.get', inline_create_scenario('get')),
+    ('inline_create.post', inline_create_scenario('post')),
+    ('inline_update.get', inline_update_scenario('get')),
+    ('inline_update.post', inline_update_scenario('post')),
+]
+
+
+def reset_database():
+    from django.core.management import call_command
+    call_command('flush', interactive=False, verbosity=0)
+
+
+def request(client, method, url, data):
+    response = getattr(client, method)(url, data if method == 'post' else None)
+    if response.status_code not in (200, 302):
+        raise AssertionError('{} {} returned {}'.format(method.upper(), url, response.status_code))
+    return response
+
+
+def run_scenario(scenario, size, repeat):
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    client = Client()
+    timings = []
+    for attempt in range(repeat):
+        reset_database()
+        method, url, data = scenario(size)
+        gc.collect()
+        start = time.perf_counter()
+        request(client, method, url, data)
+        timings.append(time.perf_counter() - start)
+
+    # queries and memory are measured on a separate run, tracemalloc slows requests down.
+    reset_database()
+    method, url, data = scenario(size)
+    gc.collect()
+    tracemalloc.start()
+    with CaptureQueriesContext(connection) as queries:
+        request(client, method, url, data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        'latency_ms': statistics.median(timings) * 1000,
+        'queries': len(queries),
+        'peak_kb': peak / 1024.0,
+    }
+
+
+def package_versions():
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:
+        return {}
+    versions = {}
+    for name in PACKAGES:
+        try:
+            versions[name] = version(name)
+        except PackageNotFoundError:
+            versions[name] = None
+    return versions
+
+
+def run(sizes, repeat, only=None):
+    results = {}
+    for name, scenario in SCENARIOS:
+        if only and not name.startswith(only):
+            continue
+        for size in sizes:
+            key = '{}@{}'.format(name, size)
+            results[key] = run_scenario(scenario, size, repeat)
+            print('{:<26} {latency_ms:>9.1f} ms {queries:>6d} queries {peak_kb:>10.1f} KiB'.format(
+                key, **results[key]))
+    return {
+        'meta': {'python': platform.python_version(), 'packages': package_versions()},
+        'results': results,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns the list of regressions of results against baseline.
+    """
+    regressions = []
+    for key, current in sorted(results['results'].items()):
+        previous = baseline['results'].get(key)
+        if previous is None:
+            continue
+        if current['queries'] > previous['queries']:
+            regressions.append('{}: {} queries, baseline {}'.format(key, current['queries'], previous['queries']))
+        for metric in ('latency_ms', 'peak_kb'):
+            limit = previous[metric] * (1 + tolerance)
+            if current[metric] > limit:
+                regressions.append('{}: {} {:.1f}, baseline {:.1f} (+{:.0f}%)'.format(
+                    key, metric, current[metric], previous[metric],
+                    (current[metric] / previous[metric] - 1) * 100))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='10,100,500')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', help='only run the scenarios starting with this name')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative latency and memory increase')
+    args = parser.parse_args(argv)
+
+    setup()
+    results = run([int(size) for size in args.sizes.split(',')], args.repeat, args.only)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print('Saved baseline to {}'.format(args.baseline))
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('No baseline at {}, run with --save-baseline to create one.'.format(args.baseline))
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print('\nREGRESSIONS against {}:'.format(args.baseline))
+        for regression in regressions:
+            print('  ' + regression)
+        return 1
+    print('\nNo regressions against {}.'.format(args.baseline))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SECRET_KEY = 'crudwrapper-benchmarks'
+DEBUG = False
+ALLOWED_HOSTS = ['*']
+USE_TZ = True
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'crispy_forms',
+    'crudwrapper',
+    'benchmarks',
+]
+
+try:
+    # crispy-forms 2 ships the bootstrap3 template pack separately.
+    import crispy_bootstrap3  # noqa
+    INSTALLED_APPS.insert(INSTALLED_APPS.index('crispy_forms') + 1, 'crispy_bootstrap3')
+except ImportError:
+    pass
+
+MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+]
+
+ROOT_URLCONF = 'benchmarks.urls'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [os.path.join(BASE_DIR, 'templates')],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+CRISPY_TEMPLATE_PACK = 'bootstrap3'
+
+# the formset scenarios post 6 fields per row, 500 rows are 3000 fields.
+DATA_UPLOAD_MAX_NUMBER_FIELDS = 10000
@@ -0,0 +1,17 @@
+try:
+    from django.urls import include, re_path as url
+except ImportError:
+    from django.conf.urls import include, url
+
+from . import views
+
+
+urlpatterns = [
+    url(r'^employees/add/$', views.EmployeeCreateView.as_view(), name='employee_create'),
+    url(r'^employees/(?P<pk>\d+)/$', views.EmployeeUpdateView.as_view(), name='employee_update'),
+    url(r'^employees/$', views.EmployeeFormSetView.as_view(), name='employee_formset'),
+    url(r'^companies/(?P<pk>\d+)/delete/$', views.CompanyDeleteView.as_view(), name='company_delete'),
+    url(r'^departments/add/$', views.DepartmentCreateView.as_view(), name='department_create'),
+    url(r'^departments/(?P<pk>\d+)/$', views.DepartmentUpdateView.as_view(), name='department_update'),
+    url(r'^crudwrapper/', include('crudwrapper.urls')),
+]
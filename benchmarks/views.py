@@ -0,0 +1,54 @@
+from crudwrapper.views import (
+    CreateView, UpdateView, DeleteView, ModelFormSetView, CreateWithInlinesView, UpdateWithInlinesView,
+    InlineFormSet,
+)
+
+from .models import Company, Department, Employee
+
+
+EMPLOYEE_FIELDS = ['department', 'name', 'email', 'hired', 'salary', 'active']
+INLINE_FIELDS = ['name', 'email', 'hired', 'salary', 'active']
+
+
+class EmployeeCreateView(CreateView):
+    model = Employee
+    fields = EMPLOYEE_FIELDS
+    success_url = '/done/'
+
+
+class EmployeeUpdateView(UpdateView):
+    model = Employee
+    fields = EMPLOYEE_FIELDS
+    success_url = '/done/'
+
+
+class CompanyDeleteView(DeleteView):
+    model = Company
+    success_url = '/done/'
+
+
+class EmployeeFormSetView(ModelFormSetView):
+    model = Employee
+    fields = EMPLOYEE_FIELDS
+    factory_kwargs = {'extra': 0}
+    success_url = '/done/'
+
+
+class EmployeeInline(InlineFormSet):
+    model = Employee
+    fields = INLINE_FIELDS
+    factory_kwargs = {'extra': 0}
+
+
+class DepartmentCreateView(CreateWithInlinesView):
+    model = Department
+    fields = ['company', 'name']
+    inlines = [EmployeeInline]
+    success_url = '/done/'
+
+
+class DepartmentUpdateView(UpdateWithInlinesView):
+    model = Department
+    fields = ['company', 'name']
+    inlines = [EmployeeInline]
+    success_url = '/done/'
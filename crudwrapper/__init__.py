@@ -1 +1,6 @@
+import django
+
 __version__ = "1.0.1"
+
+if django.VERSION < (3, 2):
+    default_app_config = 'crudwrapper.apps.CrudwrapperConfig'
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class CrudwrapperConfig(AppConfig):
+    name = 'crudwrapper'
+
+    def ready(self):
+        from .signals import connect_choices_invalidation, connect_module_perms_invalidation
+
+        # connected in every process, not only the ones that cached something.
+        connect_module_perms_invalidation()
+        connect_choices_invalidation()
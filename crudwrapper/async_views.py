@@ -0,0 +1,225 @@
+"""
+Async variants of the crudwrapper views for ASGI deployments, Django 4.1 or later.
+
+The object lookups and deletes use the async ORM, the blocking parts (access
+checks, form validation, saving, rendering context) run through
+sync_to_async() on the request's database connection.
+
+Every HTTP handler is async. Access mixins listed before the async view, e.g.
+class V(ModulePermRequiredMixin, AsyncUpdateView), keep their sync dispatch(),
+which runs in a worker thread. The braces access mixins listed after it are
+checked by the async dispatch(). Other mixins overriding dispatch() must be
+listed before the async view.
+"""
+import asyncio
+
+import django
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ImproperlyConfigured, PermissionDenied
+from django.http import Http404, HttpResponseRedirect
+
+from braces.views import LoginRequiredMixin, UserPassesTestMixin
+
+from .mixins import ModulePermRequiredMixin, UserRelatedRequiredMixin
+from .views import CreateView, UpdateView, DeleteView, ModelFormSetView
+
+if django.VERSION < (4, 1):
+    raise ImproperlyConfigured("crudwrapper.async_views requires Django 4.1 or later.")
+
+__all__ = (
+    'AsyncViewMixin', 'AsyncCreateView', 'AsyncUpdateView', 'AsyncDeleteView', 'AsyncModelFormSetView',
+)
+
+
+def _async_dispatch(dispatch):
+    """
+    Run the sync dispatch() of the mixins listed before the async view in a
+    worker thread, and await the async dispatch() it ends up returning.
+    """
+    async def wrapper(self, request, *args, **kwargs):
+        response = await sync_to_async(dispatch)(self, request, *args, **kwargs)
+        if asyncio.iscoroutine(response):
+            response = await response
+        return response
+    return wrapper
+
+
+class AsyncViewMixin(object):
+    """
+    Async dispatch() running the access checks, then prepare_async(), then
+    the handler.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        super(AsyncViewMixin, cls).__init_subclass__(**kwargs)
+        if not asyncio.iscoroutinefunction(cls.dispatch):
+            cls.dispatch = _async_dispatch(cls.dispatch)
+
+    def _inherits(self, mixin):
+        """
+        Whether mixin comes after AsyncViewMixin in the mro, so its dispatch()
+        is never called.
+        """
+        mro = type(self).__mro__
+        return mixin in mro[mro.index(AsyncViewMixin) + 1:]
+
+    async def dispatch(self, request, *args, **kwargs):
+        method = request.method.lower()
+        handler = getattr(self, method, None) if method in self.http_method_names else None
+        if handler is None:
+            return await self._not_allowed(request, *args, **kwargs)
+
+        # loads the user, so the sync code below never touches the database for it.
+        authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if self._inherits(LoginRequiredMixin) and not authenticated:
+            return await sync_to_async(self.handle_no_permission)(request)
+        for check in self.get_access_checks(request.user):
+            if not await sync_to_async(check)():
+                return await sync_to_async(self.handle_no_permission)(request)
+
+        await self.prepare_async(request)
+        return await handler(request, *args, **kwargs)
+
+    async def _not_allowed(self, request, *args, **kwargs):
+        response = self.http_method_not_allowed(request, *args, **kwargs)
+        if asyncio.iscoroutine(response):
+            response = await response
+        return response
+
+    def get_access_checks(self, user):
+        """
+        Returns the test functions of the braces access mixins the async
+        dispatch() has to run, as callables.
+        """
+        checks = []
+        if self._inherits(ModulePermRequiredMixin):
+            checks.append(lambda: ModulePermRequiredMixin.test_func(self, user))
+        if self._inherits(UserRelatedRequiredMixin):
+            checks.append(lambda: UserRelatedRequiredMixin.test_func(self, user))
+        elif not checks and self._inherits(UserPassesTestMixin):
+            checks.append(lambda: self.get_test_func()(user))
+        return checks
+
+    def handle_no_permission(self, request):
+        if hasattr(super(AsyncViewMixin, self), 'handle_no_permission'):
+            return super(AsyncViewMixin, self).handle_no_permission(request)
+        raise PermissionDenied
+
+    async def prepare_async(self, request):
+        """
+        Load what the handler needs, once the access checks passed.
+        """
+        return None
+
+    async def delete(self, request, *args, **kwargs):
+        return await self._not_allowed(request, *args, **kwargs)
+
+    def get_object(self, *args, **kwargs):
+        cached = getattr(self, '_related_object', None)
+        if cached is not None and not args and not kwargs:
+            return cached
+        return super(AsyncViewMixin, self).get_object(*args, **kwargs)
+
+    async def aget_object(self):
+        cached = getattr(self, '_related_object', None)
+        if cached is not None:
+            return cached
+        queryset = self.get_queryset()
+        lookup_url_kwarg = getattr(self, 'lookup_url_kwarg', None) or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except queryset.model.DoesNotExist:
+            raise Http404("No {} matches the given query.".format(queryset.model._meta.object_name))
+        self._related_object = obj
+        return obj
+
+
+class AsyncCreateView(AsyncViewMixin, CreateView):
+
+    async def get(self, request, *args, **kwargs):
+        form = self.get_form()
+        context = await sync_to_async(self.get_context_data)(form=form)
+        return self.render_to_response(context)
+
+    async def post(self, request, *args, **kwargs):
+        names = self.get_validation_fields()
+        if names is not None:
+            return await sync_to_async(self.validate_fields)(names)
+        form = self.get_form(data=request.POST, files=request.FILES)
+        if await sync_to_async(form.is_valid)():
+            return await sync_to_async(self.form_valid)(form)
+        return await sync_to_async(self.form_invalid)(form)
+
+
+class AsyncUpdateView(AsyncViewMixin, UpdateView):
+
+    async def get(self, request, *args, **kwargs):
+        response, validators = await sync_to_async(self.get_conditional_response)(request)
+        if response is not None:
+            return response
+        self.object = await self.aget_object()
+        form = self.get_form(instance=self.object)
+        context = await sync_to_async(self.get_context_data)(form=form)
+        return self.finish_conditional_response(self.render_to_response(context), validators)
+
+    async def post(self, request, *args, **kwargs):
+        names = self.get_validation_fields()
+        if names is not None:
+            return await sync_to_async(self.validate_fields)(names)
+        self.object = await self.aget_object()
+        form = self.get_form(data=request.POST, files=request.FILES, instance=self.object)
+        if await sync_to_async(form.is_valid)():
+            return await sync_to_async(self.form_valid)(form)
+        return await sync_to_async(self.form_invalid)(form)
+
+
+class AsyncDeleteView(AsyncViewMixin, DeleteView):
+    """
+    Deletes a single object with the async ORM, bulk, chunked and background
+    deletes run the sync post().
+    """
+
+    def get_confirmation_context(self):
+        self.object = self.get_object()
+        return self.get_context_data()
+
+    async def get(self, request, *args, **kwargs):
+        if self.related_summary and self.related_model_param in request.GET:
+            return await sync_to_async(super(AsyncDeleteView, self).get)(request, *args, **kwargs)
+        context = await sync_to_async(self.get_confirmation_context)()
+        return self.render_to_response(context)
+
+    async def post(self, request, *args, **kwargs):
+        if self.background_job or self.chunked_delete or self.get_bulk_delete_queryset() is not None:
+            return await sync_to_async(super(AsyncDeleteView, self).post)(request, *args, **kwargs)
+
+        self.object = await self.aget_object()
+        self.success_url = self.get_success_url()  # set value before object is deleted.
+        await self.object.adelete()
+        await sync_to_async(self.messages.success)(self.get_form_valid_message(), fail_silently=True)
+        return HttpResponseRedirect(self.success_url)
+
+    async def delete(self, request, *args, **kwargs):
+        return await self.post(request, *args, **kwargs)
+
+
+class AsyncModelFormSetView(AsyncViewMixin, ModelFormSetView):
+
+    async def get(self, request, *args, **kwargs):
+        response, validators = await sync_to_async(self.get_conditional_response)(request)
+        if response is not None:
+            return response
+        self.object_list = self.get_queryset()
+        formset = await sync_to_async(self.construct_formset)()
+        context = await sync_to_async(self.get_context_data)(formset=formset)
+        return self.finish_conditional_response(self.render_to_response(context), validators)
+
+    async def post(self, request, *args, **kwargs):
+        self.object_list = self.get_queryset()
+        formset = await sync_to_async(self.construct_formset)()
+        if await sync_to_async(formset.is_valid)():
+            return await sync_to_async(self.formset_valid)(formset)
+        return await sync_to_async(self.formset_invalid)(formset)
+
+    async def put(self, request, *args, **kwargs):
+        return await self.post(request, *args, **kwargs)
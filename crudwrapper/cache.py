@@ -0,0 +1,121 @@
+import threading
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+
+
+__all__ = ('LRUCache', 'get_cache_version', 'bump_cache_version', 'invalidate_on_change')
+
+
+class LRUCache(object):
+    """
+    A small thread-safe, size bounded, process-wide cache.
+
+    Least recently used entries are evicted once maxsize is reached. The hit
+    and miss counters are exposed through info(). maxsize can be a callable,
+    so it can follow a setting.
+    """
+
+    def __init__(self, maxsize=128):
+        self._maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+
+    @property
+    def maxsize(self):
+        return self._maxsize() if callable(self._maxsize) else self._maxsize
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            maxsize = self.maxsize
+            while maxsize is not None and len(self._data) > maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_create(self, key, factory):
+        """
+        Return the cached value for key, calling factory() to build it on a miss.
+        """
+        with self._lock:
+            value = self.get(key, _missing)
+            if value is _missing:
+                value = factory()
+                self.set(key, value)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'maxsize': self.maxsize,
+            'currsize': len(self._data),
+        }
+
+
+_missing = object()
+
+
+def _version_key(name):
+    return 'crudwrapper:version:{}'.format(name)
+
+
+def get_cache_version(name):
+    """
+    Returns the current version stamp of a family of cache entries. Include
+    it in the cache keys so bump_cache_version() invalidates all of them.
+    """
+    return cache.get(_version_key(name), 0)
+
+
+def bump_cache_version(name):
+    try:
+        cache.incr(_version_key(name))
+    except ValueError:
+        cache.set(_version_key(name), 1, None)
+
+
+_connected = set()
+
+
+def invalidate_on_change(name, *models):
+    """
+    Bump the cache version name whenever a row of one of models is saved or deleted.
+    """
+    for model in models:
+        uid = 'crudwrapper:{}:{}.{}'.format(name, model._meta.app_label, model._meta.model_name)
+        if uid in _connected:
+            continue
+
+        def receiver(sender, **kwargs):
+            bump_cache_version(name)
+
+        post_save.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
+        post_delete.connect(receiver, sender=model, weak=False, dispatch_uid=uid)
+        _connected.add(uid)
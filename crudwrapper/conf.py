@@ -0,0 +1,87 @@
+from django.conf import settings as django_settings
+try:
+    from django.core.signals import setting_changed
+except ImportError:
+    from django.test.signals import setting_changed
+
+
+__all__ = ('cw_settings', 'lazy_setting', 'DEFAULTS')
+
+PREFIX = 'CW_'
+
+DEFAULTS = {
+    'FORM_TEMPLATE': 'crudwrapper/base_form.html',
+    'DELETE_TEMPLATE': 'crudwrapper/base_delete.html',
+    'DELETE_RELATED_TEMPLATE': 'crudwrapper/base_delete_related.html',
+    'FORMSET_TEMPLATE': 'crudwrapper/base_formset.html',
+
+    'DEFAULT_ERROR_MESSAGE': u"Something went wrong. {} was not saved",
+    'CREATE_MESSAGE': u"{} created successfully",
+    'CREATE_ERROR_MESSAGE': None,
+    'UPDATE_MESSAGE': u"{} updated successfully",
+    'UPDATE_ERROR_MESSAGE': None,
+    'DELETE_MESSAGE': u"{} deleted successfully",
+    'DELETE_ERROR_MESSAGE': u"Something went wrong. {} was not deleted",
+
+    'FORM_CLASS_CACHE_SIZE': 128,
+    'FORMSET_CLASS_CACHE_SIZE': 128,
+    'HELPER_CACHE_SIZE': 256,
+    'CHOICES_CACHE_TIMEOUT': None,
+    'RENDER_CACHE': False,
+    'RENDER_CACHE_SIZE': 256,
+    'MODULE_PERMS_CACHE_TIMEOUT': None,
+
+    'JOB_CACHE_TIMEOUT': 60 * 60,
+    'JOB_WORKERS': 4,
+    'JOB_EXECUTOR': None,
+}
+
+# Settings that default to the value of another one when not set.
+FALLBACKS = {
+    'CREATE_ERROR_MESSAGE': 'DEFAULT_ERROR_MESSAGE',
+    'UPDATE_ERROR_MESSAGE': 'DEFAULT_ERROR_MESSAGE',
+}
+
+
+class Settings(object):
+    """
+    The CW_* settings, read from django.conf.settings on first access and
+    cached until a setting_changed signal, e.g. from override_settings.
+    """
+
+    def __getattr__(self, name):
+        if name not in DEFAULTS:
+            raise AttributeError("Unknown crudwrapper setting '{}'".format(name))
+        if name in FALLBACKS and not hasattr(django_settings, PREFIX + name):
+            value = getattr(self, FALLBACKS[name])
+        else:
+            value = getattr(django_settings, PREFIX + name, DEFAULTS[name])
+        self.__dict__[name] = value
+        return value
+
+    def reload(self):
+        self.__dict__.clear()
+
+
+cw_settings = Settings()
+
+
+def _reload_settings(setting, **kwargs):
+    if setting.startswith(PREFIX):
+        cw_settings.reload()
+
+
+setting_changed.connect(_reload_settings, dispatch_uid='crudwrapper:settings')
+
+
+class lazy_setting(object):
+    """
+    A class attribute defaulting to a crudwrapper setting, read on access.
+    Subclasses and as_view() arguments override it as usual.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        return getattr(cw_settings, self.name)
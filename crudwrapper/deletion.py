@@ -0,0 +1,176 @@
+import operator
+from collections import OrderedDict
+from functools import reduce
+
+from django.db import models, transaction
+from django.db.models import Q
+
+
+__all__ = (
+    'get_cascade_relations', 'collect_related', 'expand_related', 'summarize_related', 'model_label',
+    'chunked_delete',
+)
+
+
+def model_label(model):
+    return '{}.{}'.format(model._meta.app_label, model._meta.model_name)
+
+
+def get_cascade_relations(model):
+    """
+    Yield (related_model, field) for every relation whose rows are deleted
+    along with instances of model.
+    """
+    opts = model._meta
+    if hasattr(opts, 'get_fields'):
+        relations = [f for f in opts.get_fields(include_hidden=True)
+                     if f.auto_created and not f.concrete and (f.one_to_one or f.one_to_many)]
+    else:
+        relations = opts.get_all_related_objects(include_hidden=True)
+
+    for relation in relations:
+        field = relation.field
+        remote_field = getattr(field, 'remote_field', None) or field.rel
+        if remote_field.on_delete is models.CASCADE:
+            yield getattr(relation, 'related_model', None) or relation.model, field
+
+
+def _related_queryset(related_model, field, parent_qs, using=None):
+    remote_field = getattr(field, 'remote_field', None) or field.rel
+    target = remote_field.get_related_field().attname
+    related_qs = related_model._base_manager.filter(
+        **{'{}__in'.format(field.name): parent_qs.values(target)})
+    if using is not None:
+        related_qs = related_qs.using(using)
+    return related_qs
+
+
+def expand_related(queryset, max_depth=None, using=None):
+    """
+    Collect what queryset cascades to by loading the primary keys level by
+    level, until no new rows appear. For relation cycles, e.g. a
+    self-referential parent, whose depth depends on the data.
+
+    Returns an OrderedDict of model -> queryset of the rows found.
+    """
+    seen = OrderedDict()
+    level = [(queryset.model, list(queryset.values_list('pk', flat=True)))]
+    depth = 0
+    while level and (max_depth is None or depth < max_depth):
+        depth += 1
+        next_level = []
+        for model, pks in level:
+            parent_qs = model._base_manager.using(using or queryset.db).filter(pk__in=pks)
+            for related_model, field in get_cascade_relations(model):
+                known = seen.setdefault(related_model, set())
+                new = [pk for pk in _related_queryset(related_model, field, parent_qs, using).values_list(
+                    'pk', flat=True) if pk not in known]
+                if new:
+                    known.update(new)
+                    next_level.append((related_model, new))
+        level = next_level
+
+    return OrderedDict((model, model._base_manager.using(using or queryset.db).filter(pk__in=pks))
+                       for model, pks in seen.items() if pks)
+
+
+def collect_related(queryset, max_depth=None, using=None):
+    """
+    Walk the cascade graph of queryset breadth first, without loading any rows.
+
+    Returns an OrderedDict of model -> queryset of the rows a delete would
+    cascade to, parents before children. Every queryset is built from nested
+    subqueries, so it only hits the database when evaluated. A relation is
+    followed once per path. Where a path comes back to a relation it already
+    followed, e.g. a self-referential parent, the rest is collected by
+    expand_related(), which loads the primary keys.
+    """
+    found = OrderedDict()
+    level = [(queryset, frozenset())]
+    depth = 0
+    while level and (max_depth is None or depth < max_depth):
+        depth += 1
+        next_level = []
+        for parent_qs, followed in level:
+            relations = list(get_cascade_relations(parent_qs.model))
+            if any(field in followed for related_model, field in relations):
+                remaining = None if max_depth is None else max_depth - depth + 1
+                for model, related_qs in expand_related(parent_qs, max_depth=remaining, using=using).items():
+                    found.setdefault(model, []).append(related_qs)
+                continue
+            for related_model, field in relations:
+                related_qs = _related_queryset(related_model, field, parent_qs, using)
+                found.setdefault(related_model, []).append(related_qs)
+                next_level.append((related_qs, followed | frozenset([field])))
+        level = next_level
+
+    collected = OrderedDict()
+    for model, querysets in found.items():
+        if len(querysets) == 1:
+            collected[model] = querysets[0]
+        else:
+            lookup = reduce(operator.or_, [Q(pk__in=qs.values('pk')) for qs in querysets])
+            collected[model] = querysets[0].model._base_manager.using(
+                querysets[0].db).filter(lookup)
+    return collected
+
+
+def summarize_related(collected, sample_size=None):
+    """
+    Count the rows of each collected queryset with one COUNT query per model.
+    Up to sample_size objects are loaded per model for display.
+    """
+    summary = []
+    for model, qs in collected.items():
+        count = qs.count()
+        if not count:
+            continue
+        summary.append({
+            'model': model,
+            'label': model_label(model),
+            'name': model._meta.verbose_name_plural,
+            'count': count,
+            'samples': list(qs.order_by('pk')[:sample_size]) if sample_size else [],
+        })
+    return summary
+
+
+def chunked_delete(queryset, chunk_size=500, using=None, progress=None):
+    """
+    Delete queryset and everything it cascades to, leaf models first, in
+    transactions of at most chunk_size rows of a model. The rows of a
+    self-referential model are deleted leaves first, so no chunk cascades to
+    the rest of the tree.
+
+    progress(model, deleted, total) is called after every chunk. Chunks are
+    committed one by one, so an error leaves the already deleted rows deleted.
+
+    Returns the number of deleted rows per model.
+    """
+    using = using or queryset.db
+    collected = collect_related(queryset, using=using)
+    steps = list(reversed(list(collected.items())))
+    steps.append((queryset.model, queryset))
+
+    deleted = OrderedDict()
+    for model, qs in steps:
+        total = qs.count()
+        done = 0
+        leaves = dict(('{}__isnull'.format(field.related_query_name()), True)
+                      for related_model, field in get_cascade_relations(model) if related_model is model)
+        while done < total:
+            pks = list(qs.filter(**leaves).values_list('pk', flat=True)[:chunk_size]) if leaves else []
+            if not pks:
+                # no self-referential relation, or the rows reference each other in a cycle.
+                pks = list(qs.values_list('pk', flat=True)[:chunk_size])
+            if not pks:
+                break
+            with transaction.atomic(using=using):
+                model._base_manager.using(using).filter(pk__in=pks).delete()
+            done += len(pks)
+            if progress is not None:
+                progress(model, done, total)
+        if done:
+            # a self-referential model is both collected and the deleted model.
+            deleted[model] = deleted.get(model, 0) + done
+    return deleted
@@ -1,21 +1,80 @@
+import copy
+import hashlib
+
 from django.forms import ModelForm, Form
 from django import forms
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured
+try:
+    from django.core.exceptions import EmptyResultSet
+except ImportError:
+    from django.db.models.sql.datastructures import EmptyResultSet
+try:
+    from django.utils.encoding import force_text
+except ImportError:
+    from django.utils.encoding import force_str as force_text
+try:
+    from django.urls import get_resolver
+except ImportError:
+    from django.core.urlresolvers import get_resolver
 
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Div, HTML, Field
 
+from .cache import LRUCache, get_cache_version, invalidate_on_change
+from .conf import cw_settings, lazy_setting
+from .signals import choices_version_name
+
 
 __all__ = (
     'CrispyFormMixin', 'CrispyModelForm', 'CrispyForm', 'CrispyFormViewMixin',
     'CrispyFormSetHelper', 'FormSetHelperViewMixin', 'ReadOnlyFieldsMixin',
+    'form_class_cache', 'warm_form_class_cache', 'CachedChoicesViewMixin',
+    'helper_cache', 'RenderCacheViewMixin', 'formset_class_cache', 'CachedFormSetFactoryMixin',
+    'LazyExtraFormsMixin',
 )
 
+# Generated crispy form classes, shared by every CrispyFormViewMixin view.
+form_class_cache = LRUCache(lambda: cw_settings.FORM_CLASS_CACHE_SIZE)
+
+# Formset classes built by CachedFormSetFactoryMixin, per view or inline configuration.
+formset_class_cache = LRUCache(lambda: cw_settings.FORMSET_CLASS_CACHE_SIZE)
+
+# Fully built form and formset helpers, copied for every form and request.
+helper_cache = LRUCache(lambda: cw_settings.HELPER_CACHE_SIZE)
+
+_daterange_forms = {}
+
+
+def _freeze(value):
+    """
+    Turn list based view options (fields, exclude) into something hashable.
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+def copy_helper(helper, form=None):
+    """
+    Returns a shallow copy of a cached helper. The layout is shared and must
+    not be changed, attrs and inputs are copied.
+    """
+    helper = copy.copy(helper)
+    helper.attrs = dict(helper.attrs)
+    helper.inputs = list(helper.inputs)
+    helper.form = form
+    return helper
+
 
 def create_daterange_form(*args):
     """
     Create a dynamic DateRangeForm based on fields given.
     """
+    if args in _daterange_forms:
+        return _daterange_forms[args]
     fields = args
 
     class DateRangeForm(CrispyForm):
@@ -27,6 +86,7 @@ def create_daterange_form(*args):
         def set_layout(self):
             self.helper.disable_csrf = True
 
+    _daterange_forms[args] = DateRangeForm
     return DateRangeForm
 
 
@@ -35,7 +95,7 @@ class ReadOnlyFieldsMixin(object):
 
     def __init__(self, *args, **kwargs):
         super(ReadOnlyFieldsMixin, self).__init__(*args, **kwargs)
-        for field in (field for name, field in self.fields.iteritems() if name in self.readonly_fields):
+        for field in (field for name, field in self.fields.items() if name in self.readonly_fields):
             field.widget.attrs['disabled'] = 'true'
             field.required = False
 
@@ -52,10 +112,21 @@ class CrispyFormMixin(object):
     """
     Mixin that adds a helper property to the form.
 
+    The helper is built once per form class and set of fields, every form
+    gets a shallow copy of it. Set cache_helper = False on forms whose
+    set_layout() depends on the instance, or that change helper.layout.
     """
+    cache_helper = True
+
     @property
     def helper(self):
         if not hasattr(self, '_helper'):
+            key = (type(self), tuple(self.fields)) if self.cache_helper else None
+            cached = helper_cache.get(key) if key is not None else None
+            if cached is not None:
+                self._helper = copy_helper(cached, form=self)
+                return self._helper
+
             self._helper = FormHelper(form=self)
             self._helper.form_tag = False
             self.set_layout()
@@ -65,6 +136,8 @@ class CrispyFormMixin(object):
             self._helper.filter_by_widget(forms.DateInput).wrap(
                 Field, data_provide="datepicker", data_date_pickTime="false", data_date_format="YYYY-MM-DD"
             )
+            if key is not None:
+                helper_cache.set(key, copy_helper(self._helper))
         return self._helper
 
     def set_layout(self):
@@ -84,7 +157,12 @@ class CrispyFormViewMixin(object):
 
     """
     Auto create a CrispyModelForm for views without form_class defined
+
+    The generated class is kept in form_class_cache so it is only built once
+    per view configuration. Set cache_form_class = False to build it on every
+    request instead.
     """
+    cache_form_class = True
 
     def get_form_class(self):
         """
@@ -93,12 +171,158 @@ class CrispyFormViewMixin(object):
         if self.form_class is not None:
             return self.form_class
 
+        key = self.get_form_class_cache_key() if self.cache_form_class else None
+        if key is None:
+            return self.build_form_class()
+        return form_class_cache.get_or_create(key, self.build_form_class)
+
+    def get_form_class_cache_key(self):
+        """
+        Returns the key of the generated form class in form_class_cache, or None
+        if the form class can't be cached.
+        """
+        model = getattr(self, 'model', None)
+        if model is None:
+            return None
+        return (type(self), model, _freeze(getattr(self, 'fields', None)),
+                _freeze(getattr(self, 'exclude', None)), CrispyFormMixin)
+
+    def build_form_class(self):
         form_class = super(CrispyFormViewMixin, self).get_form_class()
         crispy_form_class = type(form_class)(form_class.__name__,
                                              (CrispyFormMixin, form_class), dict(Meta=form_class.Meta))
         return crispy_form_class
 
 
+def _iter_url_views(patterns):
+    for pattern in patterns:
+        if hasattr(pattern, 'url_patterns'):
+            for view in _iter_url_views(pattern.url_patterns):
+                yield view
+            continue
+        view_class = getattr(pattern.callback, 'view_class', None)
+        if view_class is not None:
+            yield view_class, getattr(pattern.callback, 'view_initkwargs', {})
+
+
+def warm_form_class_cache(views=None, urlconf=None):
+    """
+    Build the generated form class of every CrispyFormViewMixin view so the
+    first requests don't pay for it. Call it once at startup.
+
+    views is an iterable of view classes or (view class, initkwargs) pairs,
+    it defaults to every view registered in the urlconf.
+
+    Returns the list of view classes that were warmed.
+    """
+    if views is None:
+        views = _iter_url_views(get_resolver(urlconf).url_patterns)
+
+    warmed = []
+    for view in views:
+        view_class, initkwargs = view if isinstance(view, tuple) else (view, {})
+        if not issubclass(view_class, CrispyFormViewMixin):
+            continue
+        instance = view_class(**initkwargs)
+        instance.request, instance.args, instance.kwargs = None, (), {}
+        if instance.form_class is not None or instance.get_form_class_cache_key() is None:
+            continue
+        try:
+            instance.get_form_class()
+        except Exception:
+            # views that need the request to pick their form can't be warmed.
+            continue
+        warmed.append(view_class)
+    return warmed
+
+
+class LazyFormList(object):
+    """
+    The forms of a formset, each constructed on first access.
+
+    callbacks are called with every form constructed from then on, the
+    already constructed ones are returned by constructed().
+    """
+
+    def __init__(self, formset, total):
+        self.formset = formset
+        self._forms = [None] * total
+        self.callbacks = []
+
+    def constructed(self):
+        return [form for form in self._forms if form is not None]
+
+    def __len__(self):
+        return len(self._forms)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if self._forms[index] is None:
+            formset = self.formset
+            kwargs = formset.get_form_kwargs(index) if hasattr(formset, 'get_form_kwargs') else {}
+            form = self._forms[index] = formset._construct_form(index, **kwargs)
+            for callback in self.callbacks:
+                callback(form)
+        return self._forms[index]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class LazyExtraFormsMixin(object):
+    """
+    Formset mixin that only constructs the forms that are used, e.g. a page
+    rendering the extra rows from {{ formset.empty_form }} builds none of them.
+    """
+
+    @property
+    def forms(self):
+        if '_lazy_forms' not in self.__dict__:
+            self.__dict__['_lazy_forms'] = LazyFormList(self, self.total_form_count())
+        return self.__dict__['_lazy_forms']
+
+
+class CachedFormSetFactoryMixin(object):
+    """
+    Build the formset class of a formset view or inline once per
+    configuration, instead of calling the formset factory on every request.
+
+    cache_formset_class = False builds it on every request
+    lazy_extra_forms = only construct the forms of the formset when accessed
+    """
+    cache_formset_class = True
+    lazy_extra_forms = False
+
+    def get_formset_class_cache_key(self):
+        """
+        Returns the key of the formset class in formset_class_cache, or None
+        if the factory arguments can't be part of a key.
+        """
+        key = (type(self), getattr(self, 'model', None), getattr(self, 'inline_model', None),
+               self.lazy_extra_forms, _freeze(self.get_factory_kwargs()))
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def build_formset_class(self):
+        formset_class = super(CachedFormSetFactoryMixin, self).get_formset()
+        if self.lazy_extra_forms:
+            formset_class = type(formset_class.__name__, (LazyExtraFormsMixin, formset_class), {})
+        return formset_class
+
+    def get_formset(self):
+        key = self.get_formset_class_cache_key() if self.cache_formset_class else None
+        if key is None:
+            return self.build_formset_class()
+        return formset_class_cache.get_or_create(key, self.build_formset_class)
+
+
 class CrispyFormSetHelper(FormHelper):
 
     def __init__(self, *args, **kwargs):
@@ -143,6 +367,9 @@ class FormSetHelperViewMixin(object):
     formset_panel_layout = toggle use of panel of layout
     formset_panel_heading = text for the panel heading
     formset_panel_css = "the css class for the panel div
+
+    The configured helper is cached per view class and configuration, set
+    cache_formset_helper = False if it depends on the request.
     """
     formset_helper = CrispyFormSetHelper
     formset_helper_name = 'helper'
@@ -153,6 +380,7 @@ class FormSetHelperViewMixin(object):
     formset_form_class = 'form-horizontal'
     formset_label_class = 'col-lg-2'
     formset_field_class = 'col-lg-8'
+    cache_formset_helper = True
 
     def get_formset_helper(self):
         """
@@ -178,18 +406,127 @@ class FormSetHelperViewMixin(object):
         """
         return self.formset_panel_heading
 
-    def get_context_data(self, *args, **kwargs):
-        context = super(FormSetHelperViewMixin, self).get_context_data(
-            *args, **kwargs)
+    def build_formset_helper(self, heading):
         helper = self.get_formset_helper()()
         if self.formset_panel_layout:
-            helper.set_panel_layout(self.formset_fields, heading=self.get_formset_panel_heading(),
+            helper.set_panel_layout(self.formset_fields, heading=heading,
                                     css_class=self.formset_panel_css)
 
         # add form, label and field css classes
         helper.form_class = self.formset_form_class
         helper.label_class = self.formset_label_class
         helper.field_class = self.formset_field_class
+        return helper
+
+    def get_formset_helper_instance(self):
+        heading = self.get_formset_panel_heading()
+        if not self.cache_formset_helper:
+            return self.build_formset_helper(heading)
+        key = (type(self), self.get_formset_helper(), tuple(self.formset_fields), self.formset_panel_layout,
+               force_text(heading), self.formset_panel_css, self.formset_form_class,
+               self.formset_label_class, self.formset_field_class)
+        return copy_helper(helper_cache.get_or_create(key, lambda: self.build_formset_helper(heading)))
+
+    def get_context_data(self, *args, **kwargs):
+        context = super(FormSetHelperViewMixin, self).get_context_data(
+            *args, **kwargs)
+        context[self.get_formset_helper_name()] = self.get_formset_helper_instance()
+        return context
+
 
-        context[self.get_formset_helper_name()] = helper
+class CachedChoicesViewMixin(object):
+
+    """
+    Load the choices of every ModelChoiceField on the page once per request
+    and share them between the form, every formset row and the inlines.
+
+    cache_choices = toggle the per request choices cache
+    choices_cache_timeout = also keep the choices in the Django cache for that
+        many seconds. They are invalidated when a row of the related model is
+        saved or deleted, so querysets filtered on other models can get stale.
+
+    Every process invalidates the choices of the models a relation points to
+    when CW_CHOICES_CACHE_TIMEOUT is set. Other models, or a timeout only set
+    on the view, are invalidated by the processes that rendered their choices,
+    and otherwise only expire after the timeout.
+    """
+    cache_choices = True
+    choices_cache_timeout = lazy_setting('CHOICES_CACHE_TIMEOUT')
+
+    def get_context_data(self, *args, **kwargs):
+        context = super(CachedChoicesViewMixin, self).get_context_data(*args, **kwargs)
+        if self.cache_choices:
+            forms_ = []
+            if context.get('form') is not None:
+                forms_.append(context['form'])
+            for formset in [context.get('formset')] + list(context.get('inlines') or []):
+                if formset is None:
+                    continue
+                if isinstance(formset.forms, LazyFormList):
+                    # don't construct the lazy forms, share the choices as they are built.
+                    forms_.extend(formset.forms.constructed())
+                    formset.forms.callbacks.append(self.cache_form_choices)
+                else:
+                    forms_.extend(formset.forms)
+            for form in forms_:
+                self.cache_form_choices(form)
+        return context
+
+    def get_choices_cache_key(self, field):
+        """
+        Returns the key identifying the choices of field, or None if they
+        can't be shared.
+        """
+        queryset = field.queryset
+        try:
+            sql = str(queryset.query)
+        except EmptyResultSet:
+            return None
+        return (type(field), field.to_field_name, force_text(field.empty_label or ''), queryset.db, sql)
+
+    def cache_form_choices(self, form):
+        if not hasattr(self, '_choices_cache'):
+            self._choices_cache = {}
+        for field in form.fields.values():
+            # fields with explicitly set choices are left alone.
+            if not isinstance(field, forms.ModelChoiceField) or hasattr(field, '_choices'):
+                continue
+            key = self.get_choices_cache_key(field)
+            if key is None:
+                continue
+            if key not in self._choices_cache:
+                self._choices_cache[key] = self.load_choices(field, key)
+            field.choices = self._choices_cache[key]
+
+    def load_choices(self, field, key):
+        if self.choices_cache_timeout is None:
+            return self.evaluate_choices(field)
+
+        model = field.queryset.model
+        version_name = choices_version_name(model)
+        invalidate_on_change(version_name, model)
+        cache_key = 'crudwrapper:{}:{}:{}'.format(
+            version_name, get_cache_version(version_name),
+            hashlib.md5(repr(key).encode('utf-8')).hexdigest())
+        choices = cache.get(cache_key)
+        if choices is None:
+            choices = self.evaluate_choices(field)
+            cache.set(cache_key, choices, self.choices_cache_timeout)
+        return choices
+
+    def evaluate_choices(self, field):
+        return [(getattr(value, 'value', value), force_text(label)) for value, label in field.choices]
+
+
+class RenderCacheViewMixin(object):
+
+    """
+    Let the crudwrapper templates render forms and formsets through the
+    render cache ({% crispy_cached %}) instead of {% crispy %}.
+    """
+    render_cache = lazy_setting('RENDER_CACHE')
+
+    def get_context_data(self, *args, **kwargs):
+        context = super(RenderCacheViewMixin, self).get_context_data(*args, **kwargs)
+        context['crispy_render_cache'] = self.render_cache
         return context
@@ -0,0 +1,250 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter
+
+from django.db import connections
+from django.template.response import SimpleTemplateResponse
+
+
+__all__ = (
+    'InstrumentedViewMixin', 'QueryBudgetExceeded', 'QueryRecorder', 'sql_shape',
+    'LoggingSink', 'ServerTimingSink', 'MemorySink', 'memory_sink',
+)
+
+logger = logging.getLogger('crudwrapper.instrumentation')
+
+_literals = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def sql_shape(sql):
+    """
+    Strip the literals from a query so repeated queries can be grouped.
+    """
+    return _literals.sub('?', sql)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryRecorder(object):
+    """
+    Record the sql and duration of every query run on any connection.
+
+    Uses connection.execute_wrapper when available, django.test's
+    CaptureQueriesContext otherwise.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self._contexts = []
+        self._captures = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.time()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.time() - start))
+
+    def start(self):
+        for alias in connections:
+            connection = connections[alias]
+            if hasattr(connection, 'execute_wrapper'):
+                context = connection.execute_wrapper(self)
+            else:
+                from django.test.utils import CaptureQueriesContext
+                context = CaptureQueriesContext(connection)
+                self._captures.append(context)
+            context.__enter__()
+            self._contexts.append(context)
+
+    def stop(self):
+        while self._contexts:
+            self._contexts.pop().__exit__(None, None, None)
+        for capture in self._captures:
+            self.queries.extend((query['sql'], float(query['time'])) for query in capture.captured_queries)
+        self._captures = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class LoggingSink(object):
+    """
+    Log the stats of every request, and a warning for likely N+1 queries.
+    """
+
+    def __init__(self, logger=logger, level=logging.DEBUG):
+        self.logger = logger
+        self.level = level
+
+    def emit(self, view, request, response, stats):
+        self.logger.log(self.level, "%(view)s %(method)s %(path)s: %(queries)d queries in %(db_ms).1fms, "
+                        "template %(template_ms).1fms, forms %(form_ms).1fms, formsets %(formset_ms).1fms, "
+                        "total %(total_ms).1fms", stats)
+        for shape, count in stats['duplicates']:
+            self.logger.warning("%s: likely N+1, query repeated %d times: %s", stats['view'], count, shape)
+
+
+class ServerTimingSink(object):
+    """
+    Add the timings to the response as a Server-Timing header.
+    """
+
+    def emit(self, view, request, response, stats):
+        response['Server-Timing'] = ', '.join([
+            'db;dur={:.1f};desc="{} queries"'.format(stats['db_ms'], stats['queries']),
+            'tpl;dur={:.1f}'.format(stats['template_ms']),
+            'form;dur={:.1f}'.format(stats['form_ms']),
+            'formset;dur={:.1f}'.format(stats['formset_ms']),
+            'total;dur={:.1f}'.format(stats['total_ms']),
+        ])
+
+
+class MemorySink(object):
+    """
+    Keep the stats in memory, mostly for tests.
+    """
+
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+
+    def emit(self, view, request, response, stats):
+        with self._lock:
+            self.records.append(stats)
+
+    def clear(self):
+        with self._lock:
+            self.records = []
+
+    def for_view(self, view_class):
+        name = '{}.{}'.format(view_class.__module__, view_class.__name__)
+        return [stats for stats in self.records if stats['view'] == name]
+
+    def summary(self):
+        """
+        Returns requests, max and mean query count per view.
+        """
+        summary = {}
+        for stats in self.records:
+            item = summary.setdefault(stats['view'], {'requests': 0, 'max_queries': 0, 'total_queries': 0})
+            item['requests'] += 1
+            item['total_queries'] += stats['queries']
+            item['max_queries'] = max(item['max_queries'], stats['queries'])
+        for item in summary.values():
+            item['mean_queries'] = float(item['total_queries']) / item['requests']
+        return summary
+
+
+memory_sink = MemorySink()
+
+
+class InstrumentedViewMixin(object):
+    """
+    Record per request the number of queries, db time, template render time,
+    form validation time and formset construction time, and hand them to the
+    instrumentation_sinks.
+
+    query_budget = maximum number of queries per request, None for no limit
+    query_budget_action = 'log' or 'raise' (QueryBudgetExceeded) when over budget
+    n_plus_one_threshold = number of identical query shapes flagged as likely N+1
+
+    The stats include the queries run while rendering a TemplateResponse, so
+    they are only reported once the response is rendered. A response that is
+    never rendered reports nothing.
+    """
+    instrumentation_sinks = (LoggingSink(), )
+    query_budget = None
+    query_budget_action = 'log'
+    n_plus_one_threshold = 3
+
+    def dispatch(self, request, *args, **kwargs):
+        self.instrumentation_timings = {'form': 0.0, 'formset': 0.0, 'template': 0.0}
+        self._instrumentation_start = time.time()
+        self._query_recorder = QueryRecorder()
+        # stopped on the way out, a response that is never rendered leaves no
+        # wrapper installed on the thread's connections.
+        with self._query_recorder:
+            response = super(InstrumentedViewMixin, self).dispatch(request, *args, **kwargs)
+
+        if isinstance(response, SimpleTemplateResponse) and not response.is_rendered:
+            render = response.render
+
+            def timed_render():
+                start = time.time()
+                try:
+                    with self._query_recorder:
+                        return render()
+                finally:
+                    self.instrumentation_timings['template'] += time.time() - start
+                    self.finish_instrumentation(request, response)
+            response.render = timed_render
+        else:
+            self.finish_instrumentation(request, response)
+        return response
+
+    def time_call(self, name, func):
+        """
+        Wrap func so the time spent in it is added to instrumentation_timings[name].
+        """
+        def timed(*args, **kwargs):
+            start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.instrumentation_timings[name] = (
+                    self.instrumentation_timings.get(name, 0.0) + time.time() - start)
+        return timed
+
+    def instrument_form(self, form):
+        form.full_clean = self.time_call('form', form.full_clean)
+        return form
+
+    def get_form(self, *args, **kwargs):
+        return self.instrument_form(super(InstrumentedViewMixin, self).get_form(*args, **kwargs))
+
+    def construct_formset(self, *args, **kwargs):
+        construct = self.time_call('formset', super(InstrumentedViewMixin, self).construct_formset)
+        return self.instrument_form(construct(*args, **kwargs))
+
+    def construct_inlines(self, *args, **kwargs):
+        construct = self.time_call('formset', super(InstrumentedViewMixin, self).construct_inlines)
+        return [self.instrument_form(formset) for formset in construct(*args, **kwargs)]
+
+    def get_instrumentation_stats(self, request, response):
+        recorder = self._query_recorder
+        shapes = Counter(sql_shape(sql) for sql, duration in recorder.queries)
+        stats = {
+            'view': '{}.{}'.format(self.__class__.__module__, self.__class__.__name__),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': len(recorder.queries),
+            'db_ms': sum(duration for sql, duration in recorder.queries) * 1000,
+            'total_ms': (time.time() - self._instrumentation_start) * 1000,
+            'duplicates': [(shape, count) for shape, count in shapes.most_common()
+                           if count >= self.n_plus_one_threshold],
+        }
+        for name, value in self.instrumentation_timings.items():
+            stats['{}_ms'.format(name)] = value * 1000
+        return stats
+
+    def finish_instrumentation(self, request, response):
+        stats = self.get_instrumentation_stats(request, response)
+        for sink in self.instrumentation_sinks:
+            sink.emit(self, request, response, stats)
+
+        if self.query_budget is not None and stats['queries'] > self.query_budget:
+            msg = "{} ran {} queries, over its budget of {}".format(
+                stats['view'], stats['queries'], self.query_budget)
+            if self.query_budget_action == 'raise':
+                raise QueryBudgetExceeded(msg)
+            logger.warning(msg)
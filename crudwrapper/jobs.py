@@ -0,0 +1,235 @@
+import logging
+import threading
+import uuid
+
+from django.contrib import messages
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.http import Http404, JsonResponse
+from django.utils.module_loading import import_string
+from django.views.generic import View
+try:
+    from django.urls import reverse
+except ImportError:
+    from django.core.urlresolvers import reverse
+try:
+    from django.utils.encoding import force_text
+except ImportError:
+    from django.utils.encoding import force_str as force_text
+
+from .conf import cw_settings
+from .deletion import model_label
+
+
+__all__ = (
+    'BackgroundJobMixin', 'JobStatusView', 'ThreadPoolJobExecutor', 'ImmediateJobExecutor',
+    'create_job', 'get_job', 'update_job', 'run_job', 'get_job_executor',
+)
+
+logger = logging.getLogger('crudwrapper.jobs')
+
+PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+
+
+def _job_key(job_id):
+    return 'crudwrapper:job:{}'.format(job_id)
+
+
+def create_job(owner=None, job_id=None, **values):
+    """
+    Store a new pending job and return its id. The job store is the Django
+    cache, it has to be shared by the web and the worker processes.
+    """
+    job_id = job_id or uuid.uuid4().hex
+    job = {'id': job_id, 'owner': owner, 'status': PENDING, 'progress': {}, 'delivered': False}
+    job.update(values)
+    cache.set(_job_key(job_id), job, cw_settings.JOB_CACHE_TIMEOUT)
+    return job_id
+
+
+def get_job(job_id):
+    return cache.get(_job_key(job_id))
+
+
+_job_lock = threading.Lock()
+
+
+def update_job(job_id, **values):
+    with _job_lock:
+        job = get_job(job_id)
+        if job is None:
+            return None
+        job.update(values)
+        cache.set(_job_key(job_id), job, cw_settings.JOB_CACHE_TIMEOUT)
+        return job
+
+
+def run_job(job_id, func):
+    """
+    Run func(progress) for the job, recording its status. progress(model,
+    done, total) records how far func got with the rows of model.
+    """
+    progress = {}
+
+    def report(model, done, total):
+        progress[model_label(model)] = {'done': done, 'total': total}
+        update_job(job_id, progress=progress)
+
+    update_job(job_id, status=RUNNING)
+    try:
+        func(report)
+    except Exception as e:
+        logger.exception("Job %s failed", job_id)
+        update_job(job_id, status=FAILED, error=force_text(e))
+    else:
+        update_job(job_id, status=DONE)
+    finally:
+        connections.close_all()
+
+
+class ThreadPoolJobExecutor(object):
+    """
+    Run the jobs in a thread pool of the web process, created on first use
+    with CW_JOB_WORKERS threads unless max_workers is given.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args):
+        # concurrent.futures is python 3 only, or the futures backport.
+        from concurrent.futures import ThreadPoolExecutor
+
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers or cw_settings.JOB_WORKERS)
+        return self._pool.submit(func, *args)
+
+
+class ImmediateJobExecutor(object):
+    """
+    Run the jobs right away in the request, for tests.
+    """
+
+    def submit(self, func, *args):
+        return func(*args)
+
+
+default_executor = ThreadPoolJobExecutor()
+_executors = {}
+
+
+def get_job_executor(executor=None):
+    """
+    Returns executor, an instance of the CW_JOB_EXECUTOR class path or the
+    default thread pool executor. Any object with a submit(func, *args)
+    method, e.g. an adapter for a task queue, can run the jobs.
+    """
+    if executor is not None:
+        return executor
+    path = cw_settings.JOB_EXECUTOR
+    if path is None:
+        return default_executor
+    if path not in _executors:
+        _executors[path] = import_string(path)()
+    return _executors[path]
+
+
+def _owner(request):
+    user = getattr(request, 'user', None)
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+class BackgroundJobMixin(object):
+    """
+    Validate the submission in the request and run the write as a job.
+
+    background_job = answer a valid submission with 202 and the job id and
+        status url as json, instead of writing and redirecting
+    job_executor = the executor running the jobs, see get_job_executor()
+    job_status_url = urlname of a JobStatusView route taking a job_id kwarg,
+        the default one is in crudwrapper.urls
+
+    The form valid or invalid message is delivered by the JobStatusView once
+    the job is done or failed.
+    """
+    background_job = False
+    job_executor = None
+    job_status_url = 'crudwrapper_job_status'
+
+    def get_job_status_url(self, job_id):
+        return reverse(self.job_status_url, kwargs={'job_id': job_id})
+
+    def start_job(self, func, redirect_url=None, using=None):
+        """
+        Submit func(progress) and return the 202 response for it. The job is
+        submitted once the transaction of the using database is committed,
+        so it never sees the request's uncommitted writes or runs for a
+        rolled back request.
+        """
+        job_id = uuid.uuid4().hex
+        # resolved first, a missing route fails before anything is queued.
+        status_url = self.get_job_status_url(job_id)
+        create_job(
+            job_id=job_id,
+            owner=_owner(self.request),
+            success_message=force_text(self.get_form_valid_message()),
+            error_message=force_text(self.get_form_invalid_message()),
+            redirect_url=redirect_url,
+        )
+        executor = get_job_executor(self.job_executor)
+        transaction.on_commit(lambda: executor.submit(run_job, job_id, func), using=using)
+        response = JsonResponse({'job_id': job_id, 'status_url': status_url}, status=202)
+        response['Location'] = status_url
+        return response
+
+    def save_formset_job(self, formset, progress):
+        """
+        Save a validated formset in a job, one object at a time.
+        """
+        if getattr(self, 'bulk_save', False):
+            return self.bulk_save_formset(formset)
+        with transaction.atomic(using=router.db_for_write(formset.model)):
+            objects = formset.save(commit=False)
+            total = len(objects) + len(formset.deleted_objects)
+            done = 0
+            for obj in formset.deleted_objects:
+                obj.delete()
+                done += 1
+                progress(formset.model, done, total)
+            for obj in objects:
+                obj.save()
+                done += 1
+                progress(formset.model, done, total)
+            formset.save_m2m()
+        return objects
+
+    def formset_valid(self, formset):
+        if not self.background_job:
+            return super(BackgroundJobMixin, self).formset_valid(formset)
+        return self.start_job(lambda progress: self.save_formset_job(formset, progress),
+                              redirect_url=self.get_success_url(), using=router.db_for_write(formset.model))
+
+
+class JobStatusView(View):
+    """
+    Report the status and progress of a job as json. The messages of the job
+    are added once it is finished, so they show on the next page rendered.
+    """
+
+    def get(self, request, job_id):
+        job = get_job(job_id)
+        if job is None or (job['owner'] is not None and job['owner'] != _owner(request)):
+            raise Http404("No such job.")
+
+        if job['status'] in (DONE, FAILED) and not job['delivered']:
+            job = update_job(job_id, delivered=True) or job
+            if job['status'] == DONE:
+                messages.success(request, job['success_message'], fail_silently=True)
+            else:
+                messages.error(request, job['error_message'], fail_silently=True)
+
+        return JsonResponse(dict((name, job.get(name)) for name in (
+            'id', 'status', 'progress', 'error', 'redirect_url')))
@@ -1,19 +1,86 @@
-from django.core.exceptions import ImproperlyConfigured
+import calendar
+import csv
+import datetime
+import hashlib
+import json
+from collections import OrderedDict
+from itertools import chain
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, ValidationError, NON_FIELD_ERRORS
+from django.core.serializers.json import DjangoJSONEncoder
+try:
+    from django.core.exceptions import FieldDoesNotExist
+except ImportError:
+    from django.db.models.fields import FieldDoesNotExist
+from django.db import router, transaction
+from django.db import models
+from django.db.models import F, Count, Max, Min, Sum, OuterRef, Subquery
+from django.contrib import messages
+from django.forms.models import _get_foreign_key
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+try:
+    from django.utils.encoding import force_text
+except ImportError:
+    from django.utils.encoding import force_str as force_text
+from django.http import (Http404, HttpResponse, HttpResponseNotModified, HttpResponseRedirect,
+                         StreamingHttpResponse, JsonResponse)
 from braces.views import LoginRequiredMixin, UserPassesTestMixin, FormMessagesMixin
+from .cache import get_cache_version
+from .conf import lazy_setting
 from .forms import create_daterange_form
+from .signals import connect_module_perms_invalidation
 
 __all__ = (
     'ModulePermRequiredMixin', 'CancelURLMixin',  'UserRelatedRequiredMixin',
     'FormSetMessagesMixin', 'DateRangeQueryMixin', 'ContentStyleMixin',
+    'BulkSaveFormSetMixin', 'QueryPlanMixin', 'QuerysetExportMixin', 'KeysetPaginationMixin',
+    'PartialUpdateMixin', 'OptimisticLockMixin', 'VersionConflict', 'FieldValidationMixin',
+    'ConditionalGetMixin',
 )
 
+_missing = object()
+
+
+def split_relation_path(model, path):
+    """
+    Split a lookup path like 'owner__company__admin' into the part that can be
+    joined with select_related and the part that needs prefetch_related.
+
+    Returns (select_path, prefetch_path), either of which can be None.
+    """
+    parts = path.split('__')
+    opts = model._meta
+    for index, name in enumerate(parts):
+        try:
+            field = opts.get_field(name)
+        except FieldDoesNotExist:
+            raise ImproperlyConfigured("Invalid relation_field '{}'".format(path))
+        if not getattr(field, 'is_relation', False):
+            return '__'.join(parts[:index]) or None, None
+        if field.many_to_many or field.one_to_many:
+            return '__'.join(parts[:index]) or None, path
+        opts = field.related_model._meta
+    return path, None
+
 
 class ModulePermRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
     """
     Check if user has the required module permissions.
+
+    module_name can also be a list of app_labels. All of them are required,
+    unless module_perms_any = True.
+
+    Results are cached for the request, and in the Django cache for
+    module_perms_cache_timeout seconds when it is set.
     """
 
     module_name = None
+    module_perms_any = False
+    module_perms_cache_timeout = lazy_setting('MODULE_PERMS_CACHE_TIMEOUT')
     raise_exception = True
 
     def test_func(self, user):
@@ -22,15 +89,62 @@ class ModulePermRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
                 "'ModulePermRequiredMixin' requires "
                 "'module_name' (the app_label).")
 
-        return user.has_module_perms(self.module_name)
+        if isinstance(self.module_name, (list, tuple)):
+            module_names = list(self.module_name)
+        else:
+            module_names = [self.module_name]
+        perms = self.get_module_perms(user, module_names)
+        if self.module_perms_any:
+            return any(perms.values())
+        return all(perms.values())
+
+    def get_module_perms(self, user, module_names):
+        """
+        Returns a {module_name: has_module_perms} dict for the user.
+        """
+        request_cache = getattr(self.request, '_module_perms_cache', None)
+        if request_cache is None:
+            request_cache = self.request._module_perms_cache = {}
+
+        missing = [name for name in module_names if (user.pk, name) not in request_cache]
+        if missing and self.module_perms_cache_timeout is not None and user.pk is not None:
+            connect_module_perms_invalidation()
+            version = '{}.{}'.format(get_cache_version('module_perms'),
+                                     get_cache_version('module_perms:{}'.format(user.pk)))
+            keys = dict(('crudwrapper:module_perms:{}:{}:{}'.format(version, user.pk, name), name)
+                        for name in missing)
+            for key, value in cache.get_many(list(keys)).items():
+                request_cache[(user.pk, keys[key])] = value
+            missing = [name for name in missing if (user.pk, name) not in request_cache]
+            computed = self.compute_module_perms(user, missing) if missing else {}
+            cache.set_many(dict((key, computed[name]) for key, name in keys.items() if name in computed),
+                           self.module_perms_cache_timeout)
+        else:
+            computed = self.compute_module_perms(user, missing) if missing else {}
+
+        for name, value in computed.items():
+            request_cache[(user.pk, name)] = value
+        return dict((name, request_cache[(user.pk, name)]) for name in module_names)
+
+    def compute_module_perms(self, user, module_names):
+        # every backend decides, the default one loads the permissions once per user.
+        return dict((name, user.has_module_perms(name)) for name in module_names)
 
 
 class UserRelatedRequiredMixin(UserPassesTestMixin):
     """
     Make sure that the current User has a relation with the object.
+
+    With relation_query_check = True the related user is fetched with the
+    object in a single query, instead of walking relation_field one query per
+    hop. Multi valued relation fields are checked with one exists() query.
+
+    The object is kept on the view, so get_object() only queries once.
     """
 
     relation_field = None
+    relation_query_check = False
+    relation_annotation = '_cw_related_user'
 
     def test_func(self, user):
         if self.relation_field is None:
@@ -38,10 +152,36 @@ class UserRelatedRequiredMixin(UserPassesTestMixin):
                 "'UserRelatedRequiredMixin' requires "
                 "'relation_field' (the model field related to request.user).")
 
+        if self.relation_query_check:
+            return self.check_relation_query(self.get_object(), user)
+
         obj_result = self.get_result_relation_field(self.get_object(), self.relation_field)
 
         return obj_result == self.request.user
 
+    def check_relation_query(self, obj, user):
+        if user.pk is None:
+            return False
+        if hasattr(obj, self.relation_annotation):
+            return getattr(obj, self.relation_annotation) == user.pk
+        return type(obj)._default_manager.filter(pk=obj.pk, **{self.relation_field: user}).exists()
+
+    def get_queryset(self):
+        queryset = super(UserRelatedRequiredMixin, self).get_queryset()
+        if self.relation_query_check and self.relation_field is not None:
+            select_path, prefetch_path = split_relation_path(queryset.model, self.relation_field)
+            # multi valued relations would return the object once per related row.
+            if prefetch_path is None:
+                queryset = queryset.annotate(**{self.relation_annotation: F(self.relation_field)})
+        return queryset
+
+    def get_object(self, *args, **kwargs):
+        if args or kwargs:
+            return super(UserRelatedRequiredMixin, self).get_object(*args, **kwargs)
+        if getattr(self, '_related_object', None) is None:
+            self._related_object = super(UserRelatedRequiredMixin, self).get_object()
+        return self._related_object
+
     def get_result_relation_field(self, obj, relfield):
         fields = relfield.split('__')
         for field in fields:
@@ -113,6 +253,670 @@ class FormSetMessagesMixin(FormMessagesMixin):
         return response
 
 
+class BulkSaveFormSetMixin(object):
+    """
+    Save formsets with one query per kind of write instead of one per form.
+
+    With bulk_save = True the valid formsets are saved inside one transaction:
+    deleted rows with a single filter(pk__in=...).delete(), new rows with
+    bulk_create and changed rows with bulk_update limited to the changed fields
+    and the auto_now fields. Bulk writes don't call Model.save() and don't send pre_save/post_save.
+    """
+    bulk_save = False
+    bulk_batch_size = None
+
+    def bulk_save_formset(self, formset):
+        """
+        Save the forms of a validated formset and return the saved objects.
+        """
+        model = formset.model
+        using = router.db_for_write(model)
+        manager = model._default_manager.db_manager(using)
+        fk = getattr(formset, 'fk', None)
+        concrete_fields = set(f.name for f in model._meta.concrete_fields if not f.primary_key)
+        auto_now_fields = [f for f in model._meta.concrete_fields if getattr(f, 'auto_now', False)]
+        deleted_forms = set(formset.deleted_forms) if formset.can_delete else set()
+
+        formset.new_objects, formset.changed_objects, formset.deleted_objects = [], [], []
+        changed_by_fields = OrderedDict()
+        saved_forms = []
+        for form in formset.forms:
+            if form in deleted_forms:
+                if form.instance.pk is not None:
+                    formset.deleted_objects.append(form.instance)
+                continue
+            if not form.has_changed():
+                continue
+            obj = form.save(commit=False)
+            if fk is not None:
+                setattr(obj, fk.name, formset.instance)
+            if obj._state.adding:
+                formset.new_objects.append(obj)
+            else:
+                fields = tuple(name for name in form.changed_data if name in concrete_fields)
+                if fields:
+                    # bulk_update doesn't call pre_save(), set the auto_now fields like save() does.
+                    for field in auto_now_fields:
+                        field.pre_save(obj, False)
+                    fields += tuple(f.name for f in auto_now_fields if f.name not in fields)
+                    changed_by_fields.setdefault(fields, []).append(obj)
+                formset.changed_objects.append((obj, form.changed_data))
+            saved_forms.append(form)
+
+        with transaction.atomic(using=using):
+            if formset.deleted_objects:
+                manager.filter(pk__in=[obj.pk for obj in formset.deleted_objects]).delete()
+            if formset.new_objects:
+                manager.bulk_create(formset.new_objects, batch_size=self.bulk_batch_size)
+            for fields, objs in changed_by_fields.items():
+                if hasattr(manager, 'bulk_update'):
+                    manager.bulk_update(objs, fields, batch_size=self.bulk_batch_size)
+                else:
+                    for obj in objs:
+                        obj.save(using=using, update_fields=fields)
+            for form in saved_forms:
+                # bulk_create only sets the primary keys on some backends.
+                if form.instance.pk is not None:
+                    form.save_m2m()
+
+        return formset.new_objects + [obj for obj, fields in formset.changed_objects]
+
+    def save_form(self, form):
+        return form.save()
+
+    def formset_valid(self, formset):
+        if not self.bulk_save:
+            return super(BulkSaveFormSetMixin, self).formset_valid(formset)
+        self.object_list = self.bulk_save_formset(formset)
+        return HttpResponseRedirect(self.get_success_url())
+
+    def forms_valid(self, form, inlines):
+        if not self.bulk_save:
+            return super(BulkSaveFormSetMixin, self).forms_valid(form, inlines)
+        with transaction.atomic(using=router.db_for_write(self.model)):
+            self.object = self.save_form(form)
+            for formset in inlines:
+                formset.instance = self.object
+                self.bulk_save_formset(formset)
+        return HttpResponseRedirect(self.get_success_url())
+
+
+class PartialUpdateMixin(object):
+    """
+    Write only the changed columns of existing objects.
+
+    With partial_update = True an existing object is saved with
+    save(update_fields=...) limited to the concrete fields in
+    form.changed_data, plus the auto_now fields. Nothing is written when no
+    field changed, and only the changed many to many fields are set.
+
+    Inline forms that didn't change are skipped, changed ones are saved the same way.
+    """
+    partial_update = False
+
+    def get_update_fields(self, form):
+        """
+        Returns the names of the columns to write, an empty list if nothing changed.
+        """
+        readonly = getattr(form, 'readonly_fields', ())
+        changed = [name for name in form.changed_data if name not in readonly]
+        fields = [f.name for f in form.instance._meta.concrete_fields
+                  if not f.primary_key and f.name in changed]
+        if not fields:
+            return []
+        return fields + [f.name for f in form.instance._meta.concrete_fields
+                         if getattr(f, 'auto_now', False) and f.name not in fields]
+
+    def save_form(self, form):
+        instance = form.instance
+        if not self.partial_update or instance._state.adding or instance.pk is None:
+            return form.save()
+
+        update_fields = self.get_update_fields(form)
+        obj = form.save(commit=False)
+        if update_fields:
+            obj.save(update_fields=update_fields)
+        self.save_changed_m2m(form, obj)
+        return obj
+
+    def save_changed_m2m(self, form, obj):
+        for field in obj._meta.many_to_many:
+            if field.name in form.changed_data and field.name in form.cleaned_data:
+                field.save_form_data(obj, form.cleaned_data[field.name])
+
+    def save_formset(self, formset):
+        """
+        Save the changed forms of a validated formset with save_form().
+        """
+        fk = getattr(formset, 'fk', None)
+        deleted_forms = set(formset.deleted_forms) if formset.can_delete else set()
+        formset.new_objects, formset.changed_objects, formset.deleted_objects = [], [], []
+        for form in formset.forms:
+            if form in deleted_forms:
+                if form.instance.pk is not None:
+                    form.instance.delete()
+                    formset.deleted_objects.append(form.instance)
+                continue
+            if not form.has_changed():
+                continue
+            if fk is not None:
+                setattr(form.instance, fk.name, formset.instance)
+            adding = form.instance._state.adding
+            obj = self.save_form(form)
+            if adding:
+                formset.new_objects.append(obj)
+            else:
+                formset.changed_objects.append((obj, form.changed_data))
+        return formset.new_objects + [obj for obj, fields in formset.changed_objects]
+
+    def form_valid(self, form):
+        self.object = self.save_form(form)
+        return HttpResponseRedirect(self.get_success_url())
+
+    def forms_valid(self, form, inlines):
+        if not self.partial_update or getattr(self, 'bulk_save', False):
+            return super(PartialUpdateMixin, self).forms_valid(form, inlines)
+        with transaction.atomic(using=router.db_for_write(self.model)):
+            self.object = self.save_form(form)
+            for formset in inlines:
+                formset.instance = self.object
+                self.save_formset(formset)
+        return HttpResponseRedirect(self.get_success_url())
+
+
+class VersionConflict(Exception):
+    pass
+
+
+class OptimisticLockMixin(object):
+    """
+    Refuse to save over changes made since the form was rendered, without
+    holding row locks while the user edits.
+
+    version_field = an integer field, incremented on every save, or a
+        DateTimeField set to now. None disables the check.
+
+    The version of the rendered object is posted back as version_param, for a
+    formset a json map of pk to version. An object is written with a single
+    UPDATE ... WHERE pk = ? AND version = ?, which doesn't send
+    pre_save/post_save. The changed rows of a formset are checked with one
+    query in the saving transaction. A mismatch is reported as a form error
+    through form_invalid(), and its get_form_invalid_message(). With a
+    BackgroundJobMixin background_job the rows are checked again by the job.
+
+    The object is saved through the save_form() hook of PartialUpdateMixin.
+    """
+    version_field = None
+    version_param = 'cw_version'
+    version_conflict_message = (u"{} was changed by someone else while you were editing it. "
+                                u"Review the changes and save again.")
+
+    def get_version_field(self, model):
+        field = model._meta.get_field(self.version_field)
+        if not isinstance(field, (models.IntegerField, models.DateTimeField)):
+            raise ImproperlyConfigured(
+                "'OptimisticLockMixin' requires 'version_field' to be an "
+                "integer or a datetime field.")
+        return field
+
+    def get_next_version(self, field):
+        if isinstance(field, models.IntegerField):
+            return F(field.attname) + 1
+        return timezone.now()
+
+    def get_version_conflict_message(self, obj):
+        return self.version_conflict_message.format(obj)
+
+    def parse_version(self, field, token):
+        try:
+            return field.to_python(token)
+        except ValidationError:
+            raise VersionConflict(token)
+
+    def get_context_data(self, **kwargs):
+        context = super(OptimisticLockMixin, self).get_context_data(**kwargs)
+        if self.version_field is None:
+            return context
+        formset = context.get('formset')
+        if formset is not None:
+            field = self.get_version_field(formset.model)
+            token = json.dumps(dict((str(form.instance.pk), field.value_to_string(form.instance))
+                                    for form in formset.initial_forms))
+        elif getattr(self, 'object', None) is not None:
+            token = self.get_version_field(type(self.object)).value_to_string(self.object)
+        else:
+            return context
+        context['version_param'] = self.version_param
+        context['version_token'] = token
+        return context
+
+    def save_form(self, form):
+        instance = form.instance
+        if form is not getattr(self, '_versioned_form', None) or instance._state.adding:
+            return super(OptimisticLockMixin, self).save_form(form)
+
+        field = self.get_version_field(type(instance))
+        token = self.request.POST.get(self.version_param)
+        expected = getattr(instance, field.attname) if token is None else self.parse_version(field, token)
+        partial = getattr(self, 'partial_update', False)
+        if partial:
+            names = self.get_update_fields(form)
+            if not names:
+                return super(OptimisticLockMixin, self).save_form(form)
+        else:
+            names = [f.name for f in instance._meta.concrete_fields if not f.primary_key]
+
+        obj = form.save(commit=False)
+        values = {}
+        for name in names:
+            model_field = obj._meta.get_field(name)
+            if model_field.attname != field.attname:
+                values[model_field.attname] = model_field.pre_save(obj, False)
+        version = values[field.attname] = self.get_next_version(field)
+
+        manager = type(obj)._base_manager.using(router.db_for_write(type(obj), instance=obj))
+        if not manager.filter(pk=obj.pk, **{field.attname: expected}).update(**values):
+            raise VersionConflict(obj.pk)
+        setattr(obj, field.attname, expected + 1 if isinstance(field, models.IntegerField) else version)
+        if partial:
+            self.save_changed_m2m(form, obj)
+        else:
+            form.save_m2m()
+        return obj
+
+    def form_valid(self, form):
+        if self.version_field is None:
+            return super(OptimisticLockMixin, self).form_valid(form)
+        self._versioned_form = form
+        try:
+            with transaction.atomic(using=router.db_for_write(self.model)):
+                return super(OptimisticLockMixin, self).form_valid(form)
+        except VersionConflict:
+            form.add_error(None, self.get_version_conflict_message(form.instance))
+            return self.form_invalid(form)
+
+    def check_formset_versions(self, formset):
+        """
+        Compare the posted versions of the changed and deleted rows with the
+        database in one query, adding an error to every stale form.
+
+        Returns the pks of the changed rows.
+        """
+        field = self.get_version_field(formset.model)
+        deleted_forms = set(formset.deleted_forms) if formset.can_delete else set()
+        forms = [form for form in formset.initial_forms
+                 if form.instance.pk is not None and (form in deleted_forms or form.has_changed())]
+        if not forms:
+            return []
+
+        token = self.request.POST.get(self.version_param)
+        try:
+            submitted = json.loads(token) if token else {}
+        except ValueError:
+            submitted = {}
+        manager = formset.model._base_manager.using(router.db_for_write(formset.model))
+        current = dict(manager.select_for_update().filter(pk__in=[form.instance.pk for form in forms])
+                       .values_list('pk', field.attname))
+
+        stale = []
+        for form in forms:
+            pk = form.instance.pk
+            token = submitted.get(str(pk))
+            try:
+                expected = getattr(form.instance, field.attname) if token is None else self.parse_version(field, token)
+            except VersionConflict:
+                expected = _missing
+            if pk not in current or current[pk] != expected:
+                form.add_error(None, self.get_version_conflict_message(form.instance))
+                stale.append(pk)
+        if stale:
+            raise VersionConflict(*stale)
+        return [form.instance.pk for form in forms if form not in deleted_forms]
+
+    def bump_formset_versions(self, formset, pks):
+        if not pks:
+            return
+        field = self.get_version_field(formset.model)
+        formset.model._base_manager.using(router.db_for_write(formset.model)).filter(pk__in=pks).update(
+            **{field.attname: self.get_next_version(field)})
+
+    def save_formset_job(self, formset, progress):
+        """
+        With a background_job the rows can change between the request and the
+        job, so the job checks and bumps the versions in its own transaction.
+        A conflict fails the job.
+        """
+        if self.version_field is None:
+            return super(OptimisticLockMixin, self).save_formset_job(formset, progress)
+        with transaction.atomic(using=router.db_for_write(formset.model)):
+            changed = self.check_formset_versions(formset)
+            objects = super(OptimisticLockMixin, self).save_formset_job(formset, progress)
+            self.bump_formset_versions(formset, changed)
+        return objects
+
+    def formset_valid(self, formset):
+        if self.version_field is None:
+            return super(OptimisticLockMixin, self).formset_valid(formset)
+        try:
+            with transaction.atomic(using=router.db_for_write(formset.model)):
+                changed = self.check_formset_versions(formset)
+                response = super(OptimisticLockMixin, self).formset_valid(formset)
+                if not getattr(self, 'background_job', False):
+                    self.bump_formset_versions(formset, changed)
+        except VersionConflict:
+            return self.formset_invalid(formset)
+        return response
+
+
+class FieldValidationMixin(object):
+    """
+    Validate some fields of a form view without saving or rendering it, for
+    validating as the user types.
+
+    With field_validation = True a POST with ?validate=name,email (or the
+    X-Crudwrapper-Validate header) cleans the form without saving it, and
+    answers with {"valid": ..., "errors": {field: [messages]}} as json,
+    limited to the errors of those fields and the non field errors.
+    """
+    field_validation = False
+    validate_param = 'validate'
+    validate_header = 'HTTP_X_CRUDWRAPPER_VALIDATE'
+
+    def get_validation_fields(self):
+        """
+        Returns the requested field names, or None for a normal submission.
+        """
+        if not self.field_validation:
+            return None
+        value = self.request.GET.get(self.validate_param) or self.request.META.get(self.validate_header)
+        if not value:
+            return None
+        return [name.strip() for name in value.split(',') if name.strip()]
+
+    def get_validation_form(self):
+        data, files = self.request.POST, self.request.FILES
+        lookup_url_kwarg = getattr(self, 'lookup_url_kwarg', None) or getattr(self, 'lookup_field', None)
+        if lookup_url_kwarg in self.kwargs:
+            self.object = self.get_object()
+            return self.get_form(data=data, files=files, instance=self.object)
+        return self.get_form(data=data, files=files)
+
+    def validate_fields(self, names):
+        # the whole form is cleaned, clean() and Model.clean() can use any field.
+        form = self.get_validation_form()
+        errors = dict((name, [force_text(error) for error in field_errors])
+                      for name, field_errors in form.errors.items()
+                      if name in names or name == NON_FIELD_ERRORS)
+        return JsonResponse({'valid': not errors, 'errors': errors})
+
+    def post(self, request, *args, **kwargs):
+        names = self.get_validation_fields()
+        if names is None:
+            return super(FieldValidationMixin, self).post(request, *args, **kwargs)
+        return self.validate_fields(names)
+
+
+class ConditionalGetMixin(object):
+    """
+    Answer a GET with 304 Not Modified when the rows shown haven't changed
+    since the browser's copy.
+
+    conditional_field = a date/datetime field (compared with Max) or a version
+        field (compared with Sum) of the model and inline models. None disables it.
+    fragment_cache_timeout = also cache the rendered page per ETag and CSRF
+        cookie, so a changed browser copy is served without building the forms.
+
+    The ETag is computed with one aggregate query over the object (or the
+    formset queryset), with a subquery per inline, and includes the user and
+    the query string. Pages whose content depends on other tables, e.g. the choices of
+    a ModelChoiceField, can be served stale. Requests with pending messages
+    are always rendered.
+    """
+    conditional_field = None
+    fragment_cache_timeout = None
+
+    def get_conditional_queryset(self):
+        queryset = self.get_queryset()
+        if not hasattr(self, 'get_object'):
+            return queryset
+        lookup_field = getattr(self, 'lookup_field', None)
+        if lookup_field is not None:
+            lookup_url_kwarg = getattr(self, 'lookup_url_kwarg', None) or lookup_field
+            return queryset.filter(**{lookup_field: self.kwargs[lookup_url_kwarg]})
+        pk = self.kwargs.get(self.pk_url_kwarg)
+        if pk is not None:
+            return queryset.filter(pk=pk)
+        return queryset.filter(**{self.get_slug_field(): self.kwargs.get(self.slug_url_kwarg)})
+
+    def get_conditional_aggregates(self, model, prefix=''):
+        """
+        Returns the aggregates comparing the rows of model, reached through prefix.
+        """
+        aggregates = OrderedDict()
+        aggregates[prefix + 'count'] = Count(prefix + 'pk', distinct=True)
+        try:
+            field = model._meta.get_field(self.conditional_field)
+        except FieldDoesNotExist:
+            return aggregates
+        function = Max if isinstance(field, models.DateField) else Sum
+        aggregates[prefix + 'version'] = function(prefix + field.name)
+        return aggregates
+
+    def get_conditional_values(self):
+        queryset = self.get_conditional_queryset()
+        aggregates = self.get_conditional_aggregates(queryset.model)
+        for inline in getattr(self, 'inlines', ()):
+            fk = _get_foreign_key(queryset.model, inline.model, fk_name=getattr(inline, 'fk_name', None))
+            related_name = fk.related_query_name()
+            # aggregated per object in a subquery, joining the inlines would
+            # repeat each object once per row of every inline.
+            rows = inline.model._default_manager.filter(**{fk.name: OuterRef(fk.target_field.attname)})
+            rows = rows.order_by().values(fk.name)
+            for name, aggregate in self.get_conditional_aggregates(inline.model).items():
+                alias = '_cw_{}_{}'.format(related_name, name)
+                queryset = queryset.annotate(**{alias: Subquery(rows.annotate(value=aggregate).values('value'))})
+                outer = Sum if isinstance(aggregate, Count) else type(aggregate)
+                aggregates['{}__{}'.format(related_name, name)] = outer(alias)
+        return queryset.aggregate(**aggregates)
+
+    def get_conditional_validators(self):
+        """
+        Returns the (etag, last_modified timestamp) of the page, last_modified can be None.
+        """
+        values = self.get_conditional_values()
+        user = getattr(self.request, 'user', None)
+        parts = ['{}.{}'.format(self.__class__.__module__, self.__class__.__name__),
+                 getattr(user, 'pk', None), self.request.GET.urlencode()]
+        parts.extend('{}={}'.format(name, values[name]) for name in sorted(values))
+        etag = hashlib.md5(u'|'.join(force_text(part) for part in parts).encode('utf-8')).hexdigest()
+
+        dates = [value for value in values.values() if isinstance(value, datetime.datetime)]
+        last_modified = None
+        if dates:
+            last_modified = max(dates)
+            if timezone.is_naive(last_modified):
+                last_modified = timezone.make_aware(last_modified, timezone.get_current_timezone())
+            last_modified = calendar.timegm(last_modified.utctimetuple())
+        return quote_etag(etag), last_modified
+
+    def is_not_modified(self, etag, last_modified):
+        if_none_match = self.request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match:
+            return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+        if_modified_since = parse_http_date_safe(self.request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        return last_modified is not None and if_modified_since is not None and last_modified <= if_modified_since
+
+    def get_fragment_cache_key(self, etag):
+        csrf_cookie = self.request.COOKIES.get(settings.CSRF_COOKIE_NAME)
+        if self.fragment_cache_timeout is None or not csrf_cookie:
+            return None
+        return 'crudwrapper:page:{}:{}'.format(
+            etag.strip('"'), hashlib.md5(csrf_cookie.encode('utf-8')).hexdigest())
+
+    def set_conditional_headers(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_conditional_response(self, request):
+        """
+        Returns (response, validators). response is the 304 or the cached
+        page, or None when the page has to be rendered and passed to
+        finish_conditional_response() along with validators.
+        """
+        if self.conditional_field is None or len(messages.get_messages(request)):
+            return None, None
+
+        etag, last_modified = self.get_conditional_validators()
+        if self.is_not_modified(etag, last_modified):
+            return self.set_conditional_headers(HttpResponseNotModified(), etag, last_modified), None
+
+        key = self.get_fragment_cache_key(etag)
+        content = cache.get(key) if key is not None else None
+        if content is not None:
+            return self.set_conditional_headers(HttpResponse(content), etag, last_modified), None
+        return None, (etag, last_modified, key)
+
+    def finish_conditional_response(self, response, validators):
+        if validators is None:
+            return response
+        etag, last_modified, key = validators
+        if key is not None and hasattr(response, 'add_post_render_callback'):
+            response.add_post_render_callback(
+                lambda response: cache.set(key, response.content, self.fragment_cache_timeout))
+        return self.set_conditional_headers(response, etag, last_modified)
+
+    def get(self, request, *args, **kwargs):
+        response, validators = self.get_conditional_response(request)
+        if response is not None:
+            return response
+        response = super(ConditionalGetMixin, self).get(request, *args, **kwargs)
+        return self.finish_conditional_response(response, validators)
+
+
+class KeysetPaginationMixin(object):
+    """
+    Page a formset view with a ?after=<key> cursor instead of an OFFSET, so
+    every page costs the same however deep into the table it is.
+
+    keyset_paginate_by = rows per page, None disables the paging
+    keyset_field = the unique, indexed column the pages are ordered on
+
+    The last key of a rendered page is posted back as keyset_until_param, so
+    saving a page only ever sees the rows that were rendered on it.
+    """
+    keyset_paginate_by = None
+    keyset_field = 'pk'
+    keyset_after_param = 'after'
+    keyset_until_param = 'keyset_until'
+
+    def get_keyset_value(self, model, value):
+        if self.keyset_field == 'pk':
+            field = model._meta.pk
+        else:
+            field = model._meta.get_field(self.keyset_field)
+        try:
+            return field.to_python(value)
+        except ValidationError:
+            raise Http404("Invalid page cursor.")
+
+    def get_queryset(self):
+        queryset = super(KeysetPaginationMixin, self).get_queryset()
+        if not self.keyset_paginate_by:
+            return queryset
+
+        queryset = queryset.order_by(self.keyset_field)
+        after = self.request.GET.get(self.keyset_after_param)
+        if after:
+            queryset = queryset.filter(**{'{}__gt'.format(self.keyset_field):
+                                          self.get_keyset_value(queryset.model, after)})
+        until = self.request.POST.get(self.keyset_until_param) if self.request.method == 'POST' else None
+        if until:
+            return queryset.filter(**{'{}__lte'.format(self.keyset_field):
+                                      self.get_keyset_value(queryset.model, until)})
+        return queryset[:self.keyset_paginate_by]
+
+    def get_context_data(self, **kwargs):
+        context = super(KeysetPaginationMixin, self).get_context_data(**kwargs)
+        if not self.keyset_paginate_by:
+            return context
+
+        formset = context.get('formset')
+        objects = list(formset.get_queryset()) if formset is not None else []
+        until = getattr(objects[-1], self.keyset_field) if objects else None
+        context['keyset_until_param'] = self.keyset_until_param
+        context['keyset_until'] = until
+        context['keyset_next_url'] = None
+        context['keyset_first_url'] = None
+        params = self.request.GET.copy()
+        if len(objects) >= self.keyset_paginate_by:
+            params[self.keyset_after_param] = until
+            context['keyset_next_url'] = '?' + params.urlencode()
+        if self.request.GET.get(self.keyset_after_param):
+            params.pop(self.keyset_after_param, None)
+            context['keyset_first_url'] = '?' + params.urlencode()
+        return context
+
+
+class QueryPlanMixin(object):
+    """
+    Apply select_related/prefetch_related to the view queryset, so fetching
+    the object and walking its relations costs the same number of queries
+    however deep the relations go.
+
+    The plan is built from relation_field and the forward relations in fields.
+    Set select_related or prefetch_related to override that part of the plan,
+    an empty tuple disables it.
+
+    Inlines are left out of the plan, inline formsets always run their own query.
+    """
+    select_related = None
+    prefetch_related = None
+
+    def get_query_plan(self, model):
+        """
+        Returns the (select_related, prefetch_related) lookups for model.
+        """
+        select, prefetch = [], []
+        paths = []
+        # relation_query_check fetches the related user through an annotation.
+        if getattr(self, 'relation_field', None) and not getattr(self, 'relation_query_check', False):
+            paths.append(self.relation_field)
+
+        fields = getattr(self, 'fields', None)
+        if isinstance(fields, (list, tuple)):
+            for name in fields:
+                try:
+                    field = model._meta.get_field(name)
+                except FieldDoesNotExist:
+                    continue
+                if field.is_relation and (field.many_to_one or field.one_to_one) and field.concrete:
+                    paths.append(name)
+
+        for path in paths:
+            select_path, prefetch_path = split_relation_path(model, path)
+            if select_path and select_path not in select:
+                select.append(select_path)
+            if prefetch_path and prefetch_path not in prefetch:
+                prefetch.append(prefetch_path)
+        return select, prefetch
+
+    def get_queryset(self):
+        queryset = super(QueryPlanMixin, self).get_queryset()
+        select, prefetch = self.get_query_plan(queryset.model)
+        if self.select_related is not None:
+            select = self.select_related
+        if self.prefetch_related is not None:
+            prefetch = self.prefetch_related
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+
 class DateRangeQueryMixin(object):
     """
     The only required argument is the date_field. This will be the model field
@@ -123,12 +927,32 @@ class DateRangeQueryMixin(object):
 
     If the daterange_form member is not given, a form will be created with the
     fields for the values of start_date_q and end_date_q.
+
+    The bounds are validated through the daterange_form and applied as the
+    half-open range [start, end + 1 day), in the current timezone for
+    DateTimeFields. Invalid bounds are ignored and reported on the form.
+
+    date_range_default_days = the window ending today used when no bounds are given
+    date_range_max_days = the largest allowed span, longer ranges are shortened
+    date_range_cache_timeout = cache get_date_range_count() and friends per bounds
+
+    date_range_aggregates = {'total': Sum('amount'), 'orders': Count('pk')},
+        computed over the filtered range and added to the context as
+        daterange_summary, next to the daterange_form
+    date_range_granularity = 'day', 'week', 'month', 'quarter' or 'year' to
+        also get the aggregates per period of the date_field, None for totals only
     """
     date_field = None
     start_date_q = 'start_date'
     end_date_q = 'end_date'
     daterange_form = None
     daterange_form_context_name = 'daterange_form'
+    date_range_default_days = None
+    date_range_max_days = None
+    date_range_cache_timeout = None
+    date_range_aggregates = None
+    date_range_granularity = None
+    daterange_summary_context_name = 'daterange_summary'
 
     def get_date_field(self):
         if self.date_field is None:
@@ -151,23 +975,150 @@ class DateRangeQueryMixin(object):
                 "'end_date_q'.")
         return self.end_date_q
 
-    def get_date_range_lookup(self, date_field=None):
+    def get_today(self):
+        if settings.USE_TZ:
+            return timezone.localtime(timezone.now()).date()
+        return datetime.date.today()
+
+    def get_date_range(self):
+        """
+        Returns the validated (start, end) dates, either of which can be None.
+        """
+        if hasattr(self, '_date_range'):
+            return self._date_range
+
+        form = self.get_daterange_form_instance()
+        start = end = None
+        if form.is_valid():
+            start = form.cleaned_data.get(self.get_start_date_q())
+            end = form.cleaned_data.get(self.get_end_date_q())
+            start, end = [value.date() if isinstance(value, datetime.datetime) else value
+                          for value in (start, end)]
+
+        if start is None and end is None and self.date_range_default_days is not None:
+            end = self.get_today()
+            start = end - datetime.timedelta(days=self.date_range_default_days)
+
+        max_days = self.date_range_max_days
+        if max_days is not None:
+            max_span = datetime.timedelta(days=max_days)
+            if end is None:
+                end = start + max_span if start is not None else self.get_today()
+            if start is None or end - start > max_span:
+                if start is not None:
+                    form.add_error(None, "The date range can't be longer than {} days.".format(max_days))
+                start = end - max_span
+
+        self._date_range = (start, end)
+        return self._date_range
+
+    def get_date_bound(self, value, model, date_field):
+        """
+        Convert a date into the value compared with date_field.
+        """
+        field = None
+        if model is not None:
+            opts = model._meta
+            for name in date_field.split('__'):
+                try:
+                    field = opts.get_field(name)
+                except FieldDoesNotExist:
+                    field = None
+                    break
+                if getattr(field, 'is_relation', False):
+                    opts = field.related_model._meta
+        if isinstance(field, models.DateTimeField):
+            value = datetime.datetime.combine(value, datetime.time.min)
+            if settings.USE_TZ:
+                value = timezone.make_aware(value, timezone.get_current_timezone())
+        return value
+
+    def get_date_range_lookup(self, date_field=None, model=None):
         if not date_field:
             date_field = self.get_date_field()
-        start_date = self.request.GET.get(self.get_start_date_q(), None)
-        end_date = self.request.GET.get(self.get_end_date_q(), None)
+        if model is None:
+            model = getattr(self, 'model', None)
+        start_date, end_date = self.get_date_range()
         lookup_kwargs = {}
         if start_date:
-            lookup_kwargs['{}__gte'.format(date_field)] = start_date
+            lookup_kwargs['{}__gte'.format(date_field)] = self.get_date_bound(start_date, model, date_field)
         if end_date:
-            lookup_kwargs['{}__lte'.format(date_field)] = end_date
+            lookup_kwargs['{}__lt'.format(date_field)] = self.get_date_bound(
+                end_date + datetime.timedelta(days=1), model, date_field)
         return lookup_kwargs
 
     def get_queryset(self):
         qs = super(DateRangeQueryMixin, self).get_queryset()
-        lookup_kwargs = self.get_date_range_lookup()
+        lookup_kwargs = self.get_date_range_lookup(model=qs.model)
         return qs.filter(**lookup_kwargs)
 
+    def get_cached_date_range_value(self, name, queryset, func):
+        """
+        Returns func(), cached for date_range_cache_timeout seconds per view,
+        date range and queryset.
+        """
+        if self.date_range_cache_timeout is None:
+            return func()
+        start, end = self.get_date_range()
+        key = 'crudwrapper:daterange:{}.{}:{}:{}:{}:{}'.format(
+            self.__class__.__module__, self.__class__.__name__, name, start, end,
+            hashlib.md5(str(queryset.query).encode('utf-8')).hexdigest())
+        value = cache.get(key)
+        if value is None:
+            value = func()
+            cache.set(key, value, self.date_range_cache_timeout)
+        return value
+
+    def get_date_range_count(self):
+        queryset = self.get_queryset()
+        return self.get_cached_date_range_value('count', queryset, queryset.count)
+
+    def get_date_range_aggregates(self):
+        return dict(self.date_range_aggregates or {})
+
+    def get_date_range_summary(self):
+        """
+        Returns {'granularity', 'periods': [{'period': ..., <aggregates>}], 'totals': {<aggregates>}},
+        or None without date_range_aggregates. Cached like get_date_range_count().
+        """
+        aggregates = self.get_date_range_aggregates()
+        if not aggregates:
+            return None
+        queryset = self.get_queryset()
+        name = 'summary:{}:{}'.format(self.date_range_granularity, ','.join(sorted(aggregates)))
+        return self.get_cached_date_range_value(
+            name, queryset, lambda: self.compute_date_range_summary(queryset, aggregates))
+
+    def compute_date_range_summary(self, queryset, aggregates):
+        """
+        Group the range per period in one query. The totals of Sum, Count, Min
+        and Max are added up from the periods, the other aggregates need one
+        more query.
+        """
+        granularity = self.date_range_granularity
+        queryset = queryset.order_by()
+        if granularity is None:
+            return {'granularity': None, 'periods': [], 'totals': queryset.aggregate(**aggregates)}
+
+        from django.db.models.functions import Trunc
+        periods = list(queryset.annotate(period=Trunc(self.get_date_field(), granularity))
+                       .values('period').annotate(**aggregates).order_by('period'))
+
+        totals, missing = {}, {}
+        for name, aggregate in aggregates.items():
+            values = [row[name] for row in periods if row[name] is not None]
+            if isinstance(aggregate, Count) and not getattr(aggregate, 'distinct', False):
+                totals[name] = sum(values)
+            elif isinstance(aggregate, Sum) and not getattr(aggregate, 'distinct', False):
+                totals[name] = sum(values) if values else None
+            elif isinstance(aggregate, (Min, Max)):
+                totals[name] = (min if isinstance(aggregate, Min) else max)(values) if values else None
+            else:
+                missing[name] = aggregate
+        if missing:
+            totals.update(queryset.aggregate(**missing))
+        return {'granularity': granularity, 'periods': periods, 'totals': totals}
+
     def create_form(self):
         return create_daterange_form(self.get_start_date_q(),
                                      self.get_end_date_q())
@@ -182,6 +1133,14 @@ class DateRangeQueryMixin(object):
 
         return self.create_form()
 
+    def get_daterange_form_instance(self):
+        """
+        Returns the daterange_form bound to the request, shared by the lookup and the context.
+        """
+        if not hasattr(self, '_daterange_form_instance'):
+            self._daterange_form_instance = self.get_daterange_form()(self.request.GET)
+        return self._daterange_form_instance
+
     def get_daterange_form_context_name(self):
         if self.daterange_form_context_name is None:
             raise ImproperlyConfigured(
@@ -194,5 +1153,74 @@ class DateRangeQueryMixin(object):
         Add the daterange_form
         """
         context = super(DateRangeQueryMixin, self).get_context_data(*args, **kwargs)
-        context[self.get_daterange_form_context_name()] = self.get_daterange_form()(self.request.GET)
+        context[self.get_daterange_form_context_name()] = self.get_daterange_form_instance()
+        summary = self.get_date_range_summary()
+        if summary is not None:
+            context[self.daterange_summary_context_name] = summary
         return context
+
+
+class Echo(object):
+    """
+    File-like object that returns what is written, for streaming csv rows.
+    """
+
+    def write(self, value):
+        return value
+
+
+class QuerysetExportMixin(object):
+    """
+    Stream the view queryset as csv or json lines when requested with
+    ?format=csv or ?format=jsonl. Combine it with DateRangeQueryMixin to
+    export the filtered range.
+
+    Only export_fields are fetched, export_chunk_size rows at a time, so the
+    memory use doesn't depend on the number of rows.
+    """
+    export_fields = None
+    export_format_param = 'format'
+    export_formats = ('csv', 'jsonl')
+    export_chunk_size = 2000
+    export_filename = None
+
+    def get(self, request, *args, **kwargs):
+        export_format = request.GET.get(self.export_format_param)
+        if export_format in self.export_formats:
+            return self.render_export(export_format)
+        return super(QuerysetExportMixin, self).get(request, *args, **kwargs)
+
+    def get_export_fields(self):
+        if not self.export_fields:
+            raise ImproperlyConfigured(
+                "'QuerysetExportMixin' requires "
+                "'export_fields'.")
+        return list(self.export_fields)
+
+    def get_export_filename(self, export_format):
+        name = self.export_filename or self.get_queryset().model._meta.model_name
+        return '{}.{}'.format(name, export_format)
+
+    def iter_export_rows(self, fields):
+        queryset = self.get_queryset().values_list(*fields)
+        try:
+            rows = queryset.iterator(chunk_size=self.export_chunk_size)
+        except TypeError:
+            rows = queryset.iterator()
+        for row in rows:
+            yield row
+
+    def render_export(self, export_format):
+        fields = self.get_export_fields()
+        rows = self.iter_export_rows(fields)
+        if export_format == 'csv':
+            writer = csv.writer(Echo())
+            content = chain([writer.writerow(fields)], (writer.writerow(row) for row in rows))
+            content_type = 'text/csv'
+        else:
+            content = (json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder) + '\n' for row in rows)
+            content_type = 'application/x-ndjson'
+        response = StreamingHttpResponse(content, content_type=content_type)
+        response['Content-Disposition'] = 'attachment; filename="{}"'.format(
+            self.get_export_filename(export_format))
+        return response
@@ -0,0 +1,165 @@
+from django.conf import settings
+from django.forms.formsets import BaseFormSet
+from django.utils.safestring import mark_safe
+try:
+    from django.utils.encoding import force_text
+except ImportError:
+    from django.utils.encoding import force_str as force_text
+
+from crispy_forms.layout import HTML
+from crispy_forms.utils import render_crispy_form
+
+from .cache import LRUCache
+from .conf import cw_settings
+
+
+__all__ = ('render', 'render_form', 'render_formset', 'skeleton_cache')
+
+SENTINEL_PREFIX = '__cwprefix__'
+WIDGET_MARKER = u'\x00cw-widget:{}\x00'
+
+# Rendered crispy html of a form with markers in place of the widgets.
+skeleton_cache = LRUCache(lambda: cw_settings.RENDER_CACHE_SIZE)
+
+
+class Skeleton(object):
+
+    def __init__(self, html, widget_attrs, layout):
+        self.html = html
+        self.widget_attrs = widget_attrs
+        # keeps the layout alive, so its id() in the cache key can't be reused.
+        self.layout = layout
+
+
+def _layout_is_static(layout):
+    """
+    HTML layout objects using template variables render per request.
+    """
+    for item in getattr(layout, 'fields', ()):
+        if isinstance(item, HTML) and ('{{' in item.html or '{%' in item.html):
+            return False
+        if not _layout_is_static(item):
+            return False
+    return True
+
+
+def _helper_is_cacheable(helper):
+    """
+    The form tag renders the request's csrf token, and a helper template or
+    inputs wrap the whole form or formset, so crispy renders those.
+    """
+    if helper is None:
+        return True
+    return not (getattr(helper, 'form_tag', True) or getattr(helper, 'template', None)
+                or getattr(helper, 'inputs', None) or not _layout_is_static(getattr(helper, 'layout', None)))
+
+
+def get_skeleton_key(form, helper):
+    if not getattr(form, 'render_cache', True) or not _helper_is_cacheable(helper):
+        return None
+    layout = getattr(helper, 'layout', None)
+    options = ()
+    if helper is not None:
+        options = tuple(sorted((name, repr(value)) for name, value in vars(helper).items()
+                               if name not in ('form', 'layout', 'attrs', 'inputs')))
+    fields = tuple((name, type(field.widget)) for name, field in form.fields.items())
+    return (type(form), fields, id(layout), options, form.auto_id,
+            getattr(settings, 'CRISPY_TEMPLATE_PACK', None))
+
+
+def _marker_render(name, widget, widget_attrs):
+    def render(*args, **kwargs):
+        widget_attrs[name] = dict(widget.attrs)
+        return mark_safe(WIDGET_MARKER.format(name))
+    return render
+
+
+def _construct_sentinel(form, formset=None, index=None):
+    """
+    An unbound form of the same class as form. In a formset it is built like
+    the formset builds its forms, so it gets the same id, DELETE and ORDER
+    fields from formset.add_fields().
+    """
+    kwargs = {'prefix': SENTINEL_PREFIX, 'auto_id': form.auto_id}
+    if hasattr(form, 'use_required_attribute'):
+        kwargs['use_required_attribute'] = form.use_required_attribute
+    if formset is None:
+        return type(form)(**kwargs)
+    if hasattr(formset, 'get_form_kwargs'):
+        kwargs.update(formset.get_form_kwargs(index))
+    sentinel = formset.form(**kwargs)
+    formset.add_fields(sentinel, index)
+    return sentinel
+
+
+def build_skeleton(form, helper, context, formset=None, index=None):
+    """
+    Render an unbound form of the same class with every widget replaced by a
+    marker, and record the widget attrs crispy set on the way.
+
+    Returns a skeleton without html when a field rendered no marker, e.g.
+    the radio and checkbox lists crispy renders itself, so the form is
+    always rendered by crispy.
+    """
+    try:
+        sentinel = _construct_sentinel(form, formset, index)
+    except Exception:
+        return None
+    if list(sentinel.fields) != list(form.fields):
+        return None
+
+    widget_attrs = {}
+    for name, field in sentinel.fields.items():
+        field.widget.render = _marker_render(name, field.widget, widget_attrs)
+
+    html = force_text(render_crispy_form(sentinel, helper, context))
+    if set(widget_attrs) != set(sentinel.fields):
+        html = None
+    return Skeleton(html, widget_attrs, getattr(helper, 'layout', None))
+
+
+def render_form(form, helper=None, context=None, formset=None, index=None):
+    """
+    Render form like {% crispy form helper %}, filling the cached html of its
+    form class with the widgets of this instance. Forms with errors, and forms
+    the cache can't handle, are rendered by crispy.
+
+    formset and index are those of a form rendered as part of a formset.
+    """
+    if helper is None:
+        helper = getattr(form, 'helper', None)
+    key = get_skeleton_key(form, helper)
+    if key is None or (form.is_bound and form.errors):
+        return render_crispy_form(form, helper, context)
+
+    skeleton = skeleton_cache.get(key)
+    if skeleton is None or skeleton.layout is not getattr(helper, 'layout', None):
+        skeleton = build_skeleton(form, helper, context, formset, index)
+        if skeleton is None:
+            return render_crispy_form(form, helper, context)
+        skeleton_cache.set(key, skeleton)
+    if skeleton.html is None:
+        return render_crispy_form(form, helper, context)
+
+    html = skeleton.html.replace(SENTINEL_PREFIX + '-', form.prefix + '-' if form.prefix else '')
+    html = html.replace(SENTINEL_PREFIX, form.prefix or '')
+    for name, attrs in skeleton.widget_attrs.items():
+        bound_field = form[name]
+        bound_field.field.widget.attrs.update(attrs)
+        html = html.replace(WIDGET_MARKER.format(name), force_text(bound_field))
+    return mark_safe(html)
+
+
+def render_formset(formset, helper=None, context=None):
+    if not _helper_is_cacheable(helper) or (formset.is_bound and formset.non_form_errors()):
+        return render_crispy_form(formset, helper, context)
+    parts = [force_text(formset.management_form)]
+    parts.extend(force_text(render_form(form, helper, context, formset, index))
+                 for index, form in enumerate(formset))
+    return mark_safe(u'\n'.join(parts))
+
+
+def render(form_or_formset, helper=None, context=None):
+    if isinstance(form_or_formset, BaseFormSet):
+        return render_formset(form_or_formset, helper, context)
+    return render_form(form_or_formset, helper, context)
@@ -0,0 +1,85 @@
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import Signal
+
+from .cache import bump_cache_version, invalidate_on_change
+from .conf import cw_settings
+
+
+__all__ = ('delete_progress', 'choices_version_name', 'connect_choices_invalidation',
+           'connect_module_perms_invalidation')
+
+# Sent by DeleteView after each chunk of a chunked delete.
+# Arguments: view, model, deleted, total
+delete_progress = Signal()
+
+# The cache invalidation receivers live here rather than next to the caches,
+# so CrudwrapperConfig.ready() connects them without importing crispy-forms
+# and braces.
+
+
+def _user_perms_changed(sender, instance, **kwargs):
+    bump_cache_version('module_perms:{}'.format(instance.pk))
+
+
+def _user_perms_m2m_changed(sender, instance, action, reverse, **kwargs):
+    if not action.startswith('post_'):
+        return
+    from django.contrib.auth import get_user_model
+
+    if reverse or not isinstance(instance, get_user_model()):
+        # a group changed its permissions, or a group or permission its users:
+        # invalidate everyone.
+        bump_cache_version('module_perms')
+    else:
+        _user_perms_changed(sender, instance)
+
+
+_module_perms_invalidation_connected = []
+
+
+def connect_module_perms_invalidation():
+    """
+    Invalidate the cached module permissions when users, groups or their
+    permissions change. Connected when the app is loaded, see
+    CrudwrapperConfig.ready().
+    """
+    if _module_perms_invalidation_connected:
+        return
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.models import Group, Permission
+
+    user_model = get_user_model()
+    invalidate_on_change('module_perms', Group, Permission)
+    m2m_changed.connect(_user_perms_m2m_changed, sender=Group.permissions.through,
+                        dispatch_uid='crudwrapper:module_perms:group_permissions')
+    post_save.connect(_user_perms_changed, sender=user_model, dispatch_uid='crudwrapper:module_perms:user')
+    post_delete.connect(_user_perms_changed, sender=user_model, dispatch_uid='crudwrapper:module_perms:user')
+    for name in ('groups', 'user_permissions'):
+        if hasattr(user_model, name):
+            m2m_changed.connect(_user_perms_m2m_changed, sender=getattr(user_model, name).through,
+                                dispatch_uid='crudwrapper:module_perms:user_{}'.format(name))
+    _module_perms_invalidation_connected.append(True)
+
+
+def choices_version_name(model):
+    return 'choices:{}.{}'.format(model._meta.app_label, model._meta.model_name)
+
+
+def connect_choices_invalidation():
+    """
+    Invalidate the cached choices of every model a relation points to, when
+    CW_CHOICES_CACHE_TIMEOUT is set. Connected when the app is loaded, see
+    CrudwrapperConfig.ready(), so a process that never rendered the choices
+    still invalidates them when it saves a row.
+    """
+    if cw_settings.CHOICES_CACHE_TIMEOUT is None:
+        return
+    from django.apps import apps
+
+    targets = set()
+    for model in apps.get_models(include_auto_created=True):
+        for field in model._meta.get_fields():
+            if field.concrete and field.is_relation and field.related_model is not None:
+                targets.add(field.related_model)
+    for model in targets:
+        invalidate_on_change(choices_version_name(model), model)
@@ -0,0 +1,14 @@
+from django import template
+
+from crudwrapper import rendering
+
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def crispy_cached(context, form, helper=None):
+    """
+    Same as {% crispy form helper %}, rendered through the crudwrapper render cache.
+    """
+    return rendering.render(form, helper, context.flatten())
@@ -0,0 +1,11 @@
+try:
+    from django.urls import re_path as url
+except ImportError:
+    from django.conf.urls import url
+
+from .jobs import JobStatusView
+
+
+urlpatterns = [
+    url(r'^jobs/(?P<job_id>[0-9a-f]+)/$', JobStatusView.as_view(), name='crudwrapper_job_status'),
+]
@@ -1,19 +1,28 @@
 from django.utils.safestring import mark_safe
 from django.forms.models import BaseInlineFormSet
+from django.core.paginator import Paginator, InvalidPage
+from django.core.exceptions import ImproperlyConfigured, PermissionDenied, ValidationError
 from django.db import router
-from django.conf import settings
+from django.http import Http404, HttpResponseRedirect
+from django.template.response import TemplateResponse
 try:
-    from django.contrib.admin.util import NestedObjects
+    from django.urls import reverse
 except ImportError:
-    from django.contrib.admin.utils import NestedObjects
-from django.core.urlresolvers import reverse
+    from django.core.urlresolvers import reverse
 
 from vanilla import CreateView, UpdateView, DeleteView
 from braces.views import FormMessagesMixin
 from extra_views import ModelFormSetView, CreateWithInlinesView, UpdateWithInlinesView, InlineFormSet
 
-from .forms import CrispyFormViewMixin, FormSetHelperViewMixin
-from .mixins import CancelURLMixin, FormSetMessagesMixin
+from .conf import cw_settings, lazy_setting
+from .deletion import collect_related, summarize_related, model_label, chunked_delete
+from .forms import (CrispyFormViewMixin, FormSetHelperViewMixin, CachedChoicesViewMixin, RenderCacheViewMixin,
+                    CachedFormSetFactoryMixin)
+from .jobs import BackgroundJobMixin
+from .mixins import (CancelURLMixin, FormSetMessagesMixin, BulkSaveFormSetMixin, QueryPlanMixin,
+                     KeysetPaginationMixin, PartialUpdateMixin, OptimisticLockMixin,
+                     FieldValidationMixin, ConditionalGetMixin)
+from .signals import delete_progress
 
 """
 Wrapper views for reusable apps.
@@ -32,32 +41,23 @@ def get_form_invalid_message
 __all__ = (
     'CreateView', 'UpdateView', 'DeleteView',
     'ModelFormSetView', 'CreateWithInlinesView', 'UpdateWithInlinesView',
-    'EmptyInlineFormSet',
+    'InlineFormSet', 'EmptyInlineFormSet',
 )
 
+# The CW_* settings used to be read into these module constants on import.
+# They stay importable, read from cw_settings on access.
 PREFIX = 'CW'
-FORM_TEMPLATE = getattr(
-    settings, PREFIX + '_FORM_TEMPLATE', 'crudwrapper/base_form.html')
-DELETE_TEMPLATE = getattr(
-    settings, PREFIX + '_DELETE_TEMPLATE', 'crudwrapper/base_delete.html')
-FORMSET_TEMPLATE = getattr(
-    settings, PREFIX + '_FORMSET_TEMPLATE', 'crudwrapper/base_formset.html')
-
-DEFAULT_ERROR_MESSAGE = getattr(
-    settings, PREFIX + '_DEFAULT_ERROR_MESSAGE', u"Something went wrong. {} was not saved")
-CREATE_MESSAGE = getattr(
-    settings, PREFIX + '_CREATE_MESSAGE', u"{} created successfully")
-CREATE_ERROR_MESSAGE = getattr(
-    settings, PREFIX + '_CREATE_ERROR_MESSAGE', DEFAULT_ERROR_MESSAGE)
-UPDATE_MESSAGE = getattr(
-    settings, PREFIX + '_UPDATE_MESSAGE', u"{} updated successfully")
-UPDATE_ERROR_MESSAGE = getattr(
-    settings, PREFIX + '_UPDATE_ERROR_MESSAGE', DEFAULT_ERROR_MESSAGE)
-DELETE_MESSAGE = getattr(
-    settings, PREFIX + '_DELETE_MESSAGE', u"{} deleted successfully")
-DELETE_ERROR_MESSAGE = getattr(
-    settings, PREFIX + '_DELETE_ERROR_MESSAGE',
-    u"Something went wrong. {} was not deleted")
+SETTING_ALIASES = (
+    'FORM_TEMPLATE', 'DELETE_TEMPLATE', 'DELETE_RELATED_TEMPLATE', 'FORMSET_TEMPLATE',
+    'DEFAULT_ERROR_MESSAGE', 'CREATE_MESSAGE', 'CREATE_ERROR_MESSAGE', 'UPDATE_MESSAGE',
+    'UPDATE_ERROR_MESSAGE', 'DELETE_MESSAGE', 'DELETE_ERROR_MESSAGE',
+)
+
+
+def __getattr__(name):
+    if name in SETTING_ALIASES:
+        return getattr(cw_settings, name)
+    raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
 
 
 class SuccessURLRedirectListMixin(object):
@@ -69,108 +69,282 @@ class SuccessURLRedirectListMixin(object):
         return super(SuccessURLRedirectListMixin, self).get_success_url()
 
 
-class CreateView(FormMessagesMixin, SuccessURLRedirectListMixin, CancelURLMixin, CrispyFormViewMixin, CreateView):
-    template_name = FORM_TEMPLATE
+class CreateView(FieldValidationMixin, FormMessagesMixin, SuccessURLRedirectListMixin, CancelURLMixin,
+                 CachedChoicesViewMixin, RenderCacheViewMixin, CrispyFormViewMixin, CreateView):
+    template_name = lazy_setting('FORM_TEMPLATE')
 
     def get_form_valid_message(self):
-        msg = CREATE_MESSAGE.format(
+        msg = cw_settings.CREATE_MESSAGE.format(
             self.object)
         return mark_safe(msg)
 
     def get_form_invalid_message(self):
-        msg = CREATE_ERROR_MESSAGE.format(
+        msg = cw_settings.CREATE_ERROR_MESSAGE.format(
             self.model._meta.model_name)
         return mark_safe(msg)
 
 
-class UpdateView(FormMessagesMixin, SuccessURLRedirectListMixin, CancelURLMixin, CrispyFormViewMixin, UpdateView):
-    template_name = FORM_TEMPLATE
+class UpdateView(ConditionalGetMixin, FieldValidationMixin, OptimisticLockMixin, FormMessagesMixin,
+                 SuccessURLRedirectListMixin, CancelURLMixin, CachedChoicesViewMixin, RenderCacheViewMixin,
+                 CrispyFormViewMixin, PartialUpdateMixin, QueryPlanMixin, UpdateView):
+    template_name = lazy_setting('FORM_TEMPLATE')
 
     def get_form_valid_message(self):
-        msg = UPDATE_MESSAGE.format(
+        msg = cw_settings.UPDATE_MESSAGE.format(
             self.object)
         return mark_safe(msg)
 
     def get_form_invalid_message(self):
-        msg = UPDATE_ERROR_MESSAGE.format(
+        msg = cw_settings.UPDATE_ERROR_MESSAGE.format(
             self.object)
         return mark_safe(msg)
 
 
-class DeleteView(FormMessagesMixin, SuccessURLRedirectListMixin, CancelURLMixin, DeleteView):
-    template_name = DELETE_TEMPLATE
+class DeleteView(BackgroundJobMixin, FormMessagesMixin, SuccessURLRedirectListMixin, CancelURLMixin, QueryPlanMixin,
+                 DeleteView):
+    """
+    Lists the objects that will be deleted along with the object.
+
+    related_summary = only show a count per related model instead of the full tree
+    related_sample_size = number of objects to show per model in summary mode
+    related_max_depth = how many levels of relations to follow in summary mode
+    related_paginate_by = page size of the per model list, requested with
+        ?<related_model_param>=<app_label.model_name>&page=N
+    chunked_delete = delete the cascade leaf models first, delete_chunk_size rows per transaction
+    allow_bulk_delete = delete every object whose pk is posted as <bulk_delete_param>
+    bulk_delete_user_scoped = get_queryset() only returns objects the user may
+        delete, required for bulk deletes without a relation_field
+    background_job = run the delete as a job, see BackgroundJobMixin
+    """
+    template_name = lazy_setting('DELETE_TEMPLATE')
+    related_template_name = lazy_setting('DELETE_RELATED_TEMPLATE')
+    related_summary = False
+    related_sample_size = 5
+    related_max_depth = None
+    related_paginate_by = 50
+    related_model_param = 'related'
+    chunked_delete = False
+    delete_chunk_size = 500
+    allow_bulk_delete = False
+    bulk_delete_param = 'pk__in'
+    bulk_delete_user_scoped = False
 
     def get_form_valid_message(self):
-        msg = DELETE_MESSAGE.format(
-            self.object)
+        if self.object is None:
+            msg = cw_settings.DELETE_MESSAGE.format(u'{} {}'.format(
+                self.deleted_count, self.model._meta.verbose_name_plural))
+        else:
+            msg = cw_settings.DELETE_MESSAGE.format(
+                self.object)
         return mark_safe(msg)
 
     def get_form_invalid_message(self):
-        msg = DELETE_ERROR_MESSAGE.format(
+        msg = cw_settings.DELETE_ERROR_MESSAGE.format(
             self.object)
         return mark_safe(msg)
 
+    def get(self, request, *args, **kwargs):
+        if self.related_summary and self.related_model_param in request.GET:
+            self.object = self.get_object()
+            return self.render_related_page(request.GET[self.related_model_param])
+        return super(DeleteView, self).get(request, *args, **kwargs)
+
+    def get_related_querysets(self):
+        """
+        Returns the model -> queryset mapping of the objects cascaded to.
+        """
+        using = router.db_for_write(self.model)
+        model = type(self.object)
+        queryset = model._base_manager.using(using).filter(pk=self.object.pk)
+        return collect_related(queryset, max_depth=self.related_max_depth, using=using)
+
+    def render_related_page(self, label):
+        querysets = dict((model_label(model), qs) for model, qs in self.get_related_querysets().items())
+        if label not in querysets:
+            raise Http404("No related objects found for '{}'".format(label))
+        paginator = Paginator(querysets[label].order_by('pk'), self.related_paginate_by)
+        try:
+            page = paginator.page(self.request.GET.get('page') or 1)
+        except InvalidPage:
+            raise Http404("Invalid page.")
+        context = self.get_context_data(related_label=label, related_model_param=self.related_model_param,
+                                        related_name=querysets[label].model._meta.verbose_name_plural,
+                                        page_obj=page, paginator=paginator, related_objects=page.object_list)
+        return TemplateResponse(self.request, [self.related_template_name], context)
+
     def get_context_data(self, *args, **kwargs):
         context = super(DeleteView, self).get_context_data(*args, **kwargs)
+        if 'related_objects' in context:
+            return context
+        if self.related_summary:
+            context['related_summary'] = summarize_related(
+                self.get_related_querysets(), sample_size=self.related_sample_size)
+            context['related_model_param'] = self.related_model_param
+            return context
+        # imported here, django.contrib.admin is slow to import and often unused.
+        try:
+            from django.contrib.admin.utils import NestedObjects
+        except ImportError:
+            from django.contrib.admin.util import NestedObjects
         using = router.db_for_write(self.model)
         collector = NestedObjects(using=using)
         collector.collect([self.object])
         context['related_objects'] = collector.nested()
         return context
 
+    def get_bulk_delete_pks(self):
+        """
+        Returns the set of posted pks, converted so equivalent values like
+        '1' and '01' count once.
+        """
+        pk_field = self.get_queryset().model._meta.pk
+        try:
+            return set(pk_field.to_python(pk) for pk in self.request.POST.getlist(self.bulk_delete_param))
+        except ValidationError:
+            raise Http404("Invalid selection.")
+
+    def get_bulk_delete_queryset(self):
+        """
+        Returns the objects selected for a bulk delete, or None for a single delete.
+
+        The access checks only cover the object of the url, so the selection
+        is limited to the objects related to the user through relation_field.
+        Views without a relation_field must set bulk_delete_user_scoped to
+        say that get_queryset() only returns objects the user may delete.
+        """
+        if not self.allow_bulk_delete:
+            return None
+        pks = self.get_bulk_delete_pks()
+        if not pks:
+            return None
+        relation_field = getattr(self, 'relation_field', None)
+        if relation_field is None and not self.bulk_delete_user_scoped:
+            raise ImproperlyConfigured(
+                "'{}' allows bulk deletes but neither has a 'relation_field' nor sets "
+                "'bulk_delete_user_scoped'.".format(self.__class__.__name__))
+        try:
+            queryset = self.get_queryset().filter(pk__in=pks)
+            if relation_field is not None:
+                if not self.request.user.is_authenticated:
+                    raise PermissionDenied
+                # a subquery, multi valued relations would repeat the rows.
+                related = queryset.model._default_manager.filter(**{relation_field: self.request.user})
+                queryset = queryset.filter(pk__in=related.values('pk'))
+        except (ValueError, ValidationError):
+            raise Http404("Invalid selection.")
+        return queryset
+
+    def on_delete_progress(self, model, deleted, total):
+        """
+        Called after each chunk of a chunked delete.
+        """
+        delete_progress.send(sender=self.__class__, view=self, model=model,
+                             deleted=deleted, total=total)
+
+    def delete_objects(self, queryset, progress=None):
+        using = router.db_for_write(queryset.model)
+        if self.chunked_delete:
+            def report(model, deleted, total):
+                self.on_delete_progress(model, deleted, total)
+                if progress is not None:
+                    progress(model, deleted, total)
+            chunked_delete(queryset.using(using), chunk_size=self.delete_chunk_size,
+                           using=using, progress=report)
+        else:
+            queryset.using(using).delete()
+
     def post(self, request, *args, **kwargs):
-        self.object = self.get_object()
+        queryset = self.get_bulk_delete_queryset()
+        if queryset is not None:
+            self.object = None
+            self.deleted_count = queryset.count()
+            # don't delete a part of the selection, some pks are gone or not the user's.
+            if self.deleted_count != len(self.get_bulk_delete_pks()):
+                raise Http404("Some of the selected objects do not exist.")
+        else:
+            self.object = self.get_object()
         self.success_url = self.get_success_url()  # set value before object is deleted.
-        response = super(DeleteView, self).post(request, *args, **kwargs)
+        if self.background_job:
+            if queryset is None:
+                queryset = self.model._base_manager.filter(pk=self.object.pk)
+            return self.start_job(lambda progress: self.delete_objects(queryset, progress),
+                                  redirect_url=self.success_url, using=queryset.db)
+        if queryset is None and not self.chunked_delete:
+            response = super(DeleteView, self).post(request, *args, **kwargs)
+        else:
+            if queryset is None:
+                queryset = self.model._base_manager.filter(pk=self.object.pk)
+            self.delete_objects(queryset)
+            response = HttpResponseRedirect(self.success_url)
         self.messages.success(self.get_form_valid_message(),
                               fail_silently=True)
         return response
 
 
-class ModelFormSetView(FormSetMessagesMixin, CancelURLMixin, FormSetHelperViewMixin, ModelFormSetView):
-    template_name = FORMSET_TEMPLATE
+class ModelFormSetView(ConditionalGetMixin, OptimisticLockMixin, BackgroundJobMixin, FormSetMessagesMixin,
+                       CancelURLMixin, CachedChoicesViewMixin, RenderCacheViewMixin, FormSetHelperViewMixin,
+                       BulkSaveFormSetMixin, KeysetPaginationMixin, CachedFormSetFactoryMixin, ModelFormSetView):
+    template_name = lazy_setting('FORMSET_TEMPLATE')
 
     def get_form_valid_message(self):
-        msg = UPDATE_MESSAGE.format(self.model.__name__)
+        msg = cw_settings.UPDATE_MESSAGE.format(self.model.__name__)
         return mark_safe(msg)
 
     def get_form_invalid_message(self):
-        msg = UPDATE_ERROR_MESSAGE.format(
+        msg = cw_settings.UPDATE_ERROR_MESSAGE.format(
             self.model.__name__)
         return mark_safe(msg)
 
 
-class CreateWithInlinesView(FormSetMessagesMixin, CancelURLMixin, FormSetHelperViewMixin, CrispyFormViewMixin, CreateWithInlinesView):
-    template_name = FORMSET_TEMPLATE
+class CreateWithInlinesView(FormSetMessagesMixin, CancelURLMixin, CachedChoicesViewMixin, RenderCacheViewMixin,
+                            FormSetHelperViewMixin, CrispyFormViewMixin, BulkSaveFormSetMixin, CreateWithInlinesView):
+    template_name = lazy_setting('FORMSET_TEMPLATE')
 
     def get_form_valid_message(self):
-        msg = UPDATE_MESSAGE.format(
+        msg = cw_settings.UPDATE_MESSAGE.format(
             self.object)
         return mark_safe(msg)
 
     def get_form_invalid_message(self):
-        msg = UPDATE_ERROR_MESSAGE.format(
+        msg = cw_settings.UPDATE_ERROR_MESSAGE.format(
             self.model.__name__)
         return mark_safe(msg)
 
 
-class UpdateWithInlinesView(FormSetMessagesMixin, CancelURLMixin, FormSetHelperViewMixin, CrispyFormViewMixin, UpdateWithInlinesView):
-    template_name = FORMSET_TEMPLATE
+class UpdateWithInlinesView(ConditionalGetMixin, FormSetMessagesMixin, CancelURLMixin, CachedChoicesViewMixin,
+                            RenderCacheViewMixin, FormSetHelperViewMixin, CrispyFormViewMixin, PartialUpdateMixin,
+                            BulkSaveFormSetMixin, QueryPlanMixin, UpdateWithInlinesView):
+    template_name = lazy_setting('FORMSET_TEMPLATE')
 
     def get_form_valid_message(self):
-        msg = UPDATE_MESSAGE.format(
+        msg = cw_settings.UPDATE_MESSAGE.format(
             self.object)
         return mark_safe(msg)
 
     def get_form_invalid_message(self):
-        msg = UPDATE_ERROR_MESSAGE.format(
+        msg = cw_settings.UPDATE_ERROR_MESSAGE.format(
             self.object)
         return mark_safe(msg)
 
 
+class InlineFormSet(CachedFormSetFactoryMixin, InlineFormSet):
+    """
+    An extra-views InlineFormSet whose formset class is built once per configuration.
+    """
+
+
 class EmptyBaseInlineFormSet(BaseInlineFormSet):
+    """
+    An inline formset that never lists existing objects, nor queries for them.
+    """
+
     def get_queryset(self, *args, **kwargs):
-        return self.model._default_manager.get_queryset().none()
+        if not hasattr(self, '_queryset'):
+            self._queryset = self.model._default_manager.none()
+        return self._queryset
+
+    def initial_form_count(self):
+        return 0
 
 
 class EmptyInlineFormSet(InlineFormSet):
@@ -0,0 +1,24 @@
+#!/usr/bin/env python
+"""
+Run the test suite against the benchmarks app.
+
+    python runtests.py [test labels]
+"""
+import os
+import sys
+
+import django
+from django.conf import settings
+from django.test.utils import get_runner
+
+
+def main(labels):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+    django.setup()
+    runner = get_runner(settings)()
+    failures = runner.run_tests(labels or ['tests'])
+    sys.exit(bool(failures))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -20,7 +20,7 @@ setup(
     author_email="jerick@icannhas.com",
     url="https://github.com/jericksanjuan/django-crudwrapper",
     license="",
-    packages=["crudwrapper"],
+    packages=["crudwrapper", "crudwrapper.templatetags"],
     zip_safe=False,
     install_requires=[
         "Django >= 1.4.1",
@@ -29,6 +29,10 @@ setup(
         "django-vanilla-views >= 1.0.2",
         "django-crispy-forms >= 1.4.0",
     ],
+    extras_require={
+        # crudwrapper.async_views
+        "async": ["Django >= 4.1"],
+    },
     include_package_data=True,
     classifiers=[
         "Programming Language :: Python",
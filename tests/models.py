@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.db import models
+
+
+class Note(models.Model):
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notes')
+    title = models.CharField(max_length=100)
+
+    def __str__(self):
+        return self.title
+
+
+class Category(models.Model):
+    parent = models.ForeignKey('self', null=True, blank=True, on_delete=models.CASCADE, related_name='children')
+    name = models.CharField(max_length=100)
+
+    def __str__(self):
+        return self.name
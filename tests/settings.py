@@ -0,0 +1,13 @@
+from benchmarks.settings import *  # noqa
+
+INSTALLED_APPS = INSTALLED_APPS + ['tests']
+
+ROOT_URLCONF = 'tests.urls'
+
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
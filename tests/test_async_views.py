@@ -0,0 +1,130 @@
+import datetime
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.exceptions import PermissionDenied
+from django.test import TestCase
+
+from benchmarks.models import Company, Department, Employee
+from benchmarks.views import EMPLOYEE_FIELDS
+from crudwrapper.async_views import AsyncCreateView, AsyncDeleteView, AsyncModelFormSetView, AsyncUpdateView
+from crudwrapper.mixins import ModulePermRequiredMixin, UserRelatedRequiredMixin
+
+from .models import Note
+from .utils import make_async_request
+
+
+class EmployeeUpdateView(ModulePermRequiredMixin, AsyncUpdateView):
+    model = Employee
+    fields = EMPLOYEE_FIELDS
+    success_url = '/done/'
+    module_name = 'benchmarks'
+
+
+class NoteDeleteView(UserRelatedRequiredMixin, AsyncDeleteView):
+    model = Note
+    success_url = '/done/'
+    relation_field = 'owner'
+    raise_exception = True
+    collected = []
+
+    def get_confirmation_context(self):
+        self.collected.append(self.kwargs['pk'])
+        return super(NoteDeleteView, self).get_confirmation_context()
+
+
+class InheritedCheckNoteDeleteView(AsyncDeleteView, UserRelatedRequiredMixin):
+    model = Note
+    success_url = '/done/'
+    relation_field = 'owner'
+    raise_exception = True
+
+
+class AsyncViewTests(TestCase):
+
+    def setUp(self):
+        user_model = get_user_model()
+        self.alice = user_model.objects.create_user('alice', password='secret')
+        self.bob = user_model.objects.create_user('bob', password='secret')
+        self.note = Note.objects.create(owner=self.alice, title='Alice')
+        department = Department.objects.create(company=Company.objects.create(name='Acme'), name='Sales')
+        self.employee = Employee.objects.create(department=department, name='Employee', email='e@example.com',
+                                                hired=datetime.date(2020, 1, 1), salary='1000.00')
+        NoteDeleteView.collected = []
+
+    def test_every_handler_is_async(self):
+        views = [
+            AsyncCreateView.as_view(model=Employee, fields=EMPLOYEE_FIELDS),
+            AsyncUpdateView.as_view(model=Employee, fields=EMPLOYEE_FIELDS),
+            AsyncDeleteView.as_view(model=Note),
+            AsyncModelFormSetView.as_view(model=Employee, fields=EMPLOYEE_FIELDS),
+            EmployeeUpdateView.as_view(),
+            NoteDeleteView.as_view(),
+        ]
+        for view in views:
+            self.assertTrue(view.view_class.view_is_async)
+
+    async def test_access_mixin_before_the_view_denies(self):
+        request = make_async_request('get', user=self.bob)
+        with self.assertRaises(PermissionDenied):
+            await EmployeeUpdateView.as_view()(request, pk=self.employee.pk)
+
+    async def test_access_mixin_before_the_view_allows(self):
+        permission = await Permission.objects.aget(content_type__app_label='benchmarks',
+                                                   codename='change_employee')
+        await self.bob.user_permissions.aadd(permission)
+        user = await get_user_model().objects.aget(pk=self.bob.pk)
+
+        response = await EmployeeUpdateView.as_view()(make_async_request('get', user=user), pk=self.employee.pk)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context_data['form'].instance, self.employee)
+
+    async def test_post_saves(self):
+        self.alice.is_superuser = True
+        data = {'department': self.employee.department_id, 'name': 'Renamed', 'email': 'e@example.com',
+                'hired': '2020-01-01', 'salary': '1000.00', 'active': 'on'}
+        request = make_async_request('post', data=data, user=self.alice)
+
+        response = await EmployeeUpdateView.as_view()(request, pk=self.employee.pk)
+
+        self.assertEqual(response.status_code, 302)
+        employee = await Employee.objects.aget(pk=self.employee.pk)
+        self.assertEqual(employee.name, 'Renamed')
+
+    async def test_related_objects_are_collected_after_the_checks(self):
+        with self.assertRaises(PermissionDenied):
+            await NoteDeleteView.as_view()(make_async_request('get', user=self.bob), pk=self.note.pk)
+        self.assertEqual(NoteDeleteView.collected, [])
+
+        response = await NoteDeleteView.as_view()(make_async_request('get', user=self.alice), pk=self.note.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(NoteDeleteView.collected, [self.note.pk])
+
+    async def test_inherited_access_mixin_is_checked(self):
+        with self.assertRaises(PermissionDenied):
+            await InheritedCheckNoteDeleteView.as_view()(make_async_request('post', user=self.bob),
+                                                         pk=self.note.pk)
+        self.assertTrue(await Note.objects.filter(pk=self.note.pk).aexists())
+
+    async def test_delete_method(self):
+        response = await NoteDeleteView.as_view()(make_async_request('delete', user=self.alice), pk=self.note.pk)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(await Note.objects.filter(pk=self.note.pk).aexists())
+
+    async def test_delete_method_not_allowed_on_forms(self):
+        self.alice.is_superuser = True
+        request = make_async_request('delete', user=self.alice)
+
+        response = await EmployeeUpdateView.as_view()(request, pk=self.employee.pk)
+
+        self.assertEqual(response.status_code, 405)
+
+    async def test_formset_get(self):
+        view = AsyncModelFormSetView.as_view(model=Employee, fields=EMPLOYEE_FIELDS, factory_kwargs={'extra': 0})
+
+        response = await view(make_async_request('get', user=self.alice))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context_data['formset'].forms), 1)
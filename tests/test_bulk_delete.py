@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured
+from django.http import Http404
+from django.test import TestCase
+
+from crudwrapper.mixins import UserRelatedRequiredMixin
+from crudwrapper.views import DeleteView
+
+from .models import Note
+from .utils import make_request
+
+
+class NoteDeleteView(UserRelatedRequiredMixin, DeleteView):
+    model = Note
+    success_url = '/done/'
+    relation_field = 'owner'
+    allow_bulk_delete = True
+
+
+class UnscopedNoteDeleteView(DeleteView):
+    model = Note
+    success_url = '/done/'
+    allow_bulk_delete = True
+
+
+class ScopedNoteDeleteView(UnscopedNoteDeleteView):
+    bulk_delete_user_scoped = True
+
+    def get_queryset(self):
+        return Note.objects.filter(owner=self.request.user)
+
+
+class BulkDeleteTests(TestCase):
+
+    def setUp(self):
+        user_model = get_user_model()
+        self.alice = user_model.objects.create_user('alice', password='secret')
+        self.bob = user_model.objects.create_user('bob', password='secret')
+        self.own = [Note.objects.create(owner=self.alice, title='Alice {}'.format(i)) for i in range(2)]
+        self.other = Note.objects.create(owner=self.bob, title='Bob')
+
+    def post(self, view_class, pks, user=None):
+        request = make_request('post', data={'pk__in': [str(pk) for pk in pks]}, user=user or self.alice)
+        return view_class.as_view()(request, pk=self.own[0].pk)
+
+    def test_deletes_the_users_objects(self):
+        response = self.post(NoteDeleteView, [note.pk for note in self.own])
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(Note.objects.all()), [self.other])
+
+    def test_other_users_objects_are_refused(self):
+        with self.assertRaises(Http404):
+            self.post(NoteDeleteView, [self.own[1].pk, self.other.pk])
+
+        # nothing is deleted, not even the part of the selection the user owns.
+        self.assertEqual(Note.objects.count(), 3)
+
+    def test_missing_objects_are_refused(self):
+        with self.assertRaises(Http404):
+            self.post(NoteDeleteView, [self.own[1].pk, self.other.pk + 100])
+
+        self.assertEqual(Note.objects.count(), 3)
+
+    def test_equivalent_pks_count_once(self):
+        pk = self.own[1].pk
+        response = self.post(NoteDeleteView, [pk, '0{}'.format(pk)])
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Note.objects.filter(pk=pk).exists())
+
+    def test_invalid_pks_are_refused(self):
+        with self.assertRaises(Http404):
+            self.post(NoteDeleteView, ['not-a-pk'])
+
+    def test_unscoped_view_is_misconfigured(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.post(UnscopedNoteDeleteView, [self.own[1].pk])
+
+        self.assertEqual(Note.objects.count(), 3)
+
+    def test_user_scoped_queryset(self):
+        with self.assertRaises(Http404):
+            self.post(ScopedNoteDeleteView, [self.own[1].pk, self.other.pk])
+
+        response = self.post(ScopedNoteDeleteView, [self.own[1].pk])
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Note.objects.filter(pk=self.own[1].pk).exists())
@@ -0,0 +1,69 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from benchmarks.data import make_company
+from benchmarks.models import Department, Employee, Task
+from crudwrapper.views import InlineFormSet, UpdateWithInlinesView
+
+from .utils import make_request
+
+
+class TaskInline(InlineFormSet):
+    model = Task
+    fields = ['title', 'due', 'done']
+
+
+class EmployeeInline(InlineFormSet):
+    model = Employee
+    fields = ['name', 'email', 'hired', 'salary', 'active']
+
+
+class EmployeeUpdateView(UpdateWithInlinesView):
+    model = Employee
+    fields = ['name']
+    inlines = [TaskInline]
+    conditional_field = 'version'
+
+
+class DepartmentUpdateView(UpdateWithInlinesView):
+    model = Department
+    fields = ['name']
+    inlines = [EmployeeInline]
+    conditional_field = 'version'
+
+
+class ConditionalValuesTests(TestCase):
+
+    def get_values(self, view_class, obj):
+        view = view_class()
+        view.setup(make_request('get'), pk=obj.pk)
+        with CaptureQueriesContext(connection) as queries:
+            values = view.get_conditional_values()
+        self.assertEqual(len(queries), 1)
+        return values
+
+    def test_inline_rows_do_not_repeat_the_object(self):
+        make_company(departments=1, employees=1, tasks=3)
+        employee = Employee.objects.get()
+        Employee.objects.filter(pk=employee.pk).update(version=2)
+
+        values = self.get_values(EmployeeUpdateView, employee)
+
+        self.assertEqual(values, {'count': 1, 'version': 2, 'tasks__count': 3})
+
+    def test_inline_aggregates(self):
+        make_company(departments=2, employees=3)
+        department = Department.objects.first()
+        Employee.objects.filter(department=department).update(version=1)
+        Employee.objects.filter(department=department).exclude(pk=department.employees.first().pk).update(version=4)
+
+        values = self.get_values(DepartmentUpdateView, department)
+
+        self.assertEqual(values, {'count': 1, 'employees__count': 3, 'employees__version': 9})
+
+    def test_object_without_inline_rows(self):
+        company = make_company(departments=1, employees=0)
+        values = self.get_values(DepartmentUpdateView, company.departments.get())
+
+        self.assertEqual(values, {'count': 1, 'employees__count': None, 'employees__version': None})
@@ -0,0 +1,38 @@
+import subprocess
+import sys
+
+from django.test import SimpleTestCase, override_settings
+
+from crudwrapper import views
+
+
+class SettingAliasTests(SimpleTestCase):
+
+    def test_old_constants_importable(self):
+        from crudwrapper.views import FORM_TEMPLATE, PREFIX
+
+        self.assertEqual(FORM_TEMPLATE, 'crudwrapper/base_form.html')
+        self.assertEqual(PREFIX, 'CW')
+
+    @override_settings(CW_UPDATE_MESSAGE=u"{} saved", CW_DEFAULT_ERROR_MESSAGE=u"{} failed")
+    def test_constants_read_settings_on_access(self):
+        self.assertEqual(views.UPDATE_MESSAGE, u"{} saved")
+        self.assertEqual(views.CREATE_ERROR_MESSAGE, u"{} failed")
+
+    def test_unknown_attribute(self):
+        with self.assertRaises(AttributeError):
+            views.NO_SUCH_SETTING
+
+
+class AppReadyTests(SimpleTestCase):
+
+    def test_setup_does_not_import_form_libraries(self):
+        code = (
+            "import os, sys, django\n"
+            "os.environ['DJANGO_SETTINGS_MODULE'] = 'tests.settings'\n"
+            "django.setup()\n"
+            "print(','.join(name for name in ('braces.views', 'crispy_forms.helper', 'crudwrapper.forms',"
+            " 'crudwrapper.mixins') if name in sys.modules))\n"
+        )
+        output = subprocess.check_output([sys.executable, '-c', code])
+        self.assertEqual(output.decode('utf-8').strip(), '')
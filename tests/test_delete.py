@@ -0,0 +1,101 @@
+from django.http import Http404
+from django.test import TestCase
+
+from benchmarks.models import Company, Department, Employee, Task
+from crudwrapper.deletion import chunked_delete, collect_related
+from crudwrapper.views import DeleteView
+
+from .models import Category
+from .utils import make_request
+
+
+class CompanyDeleteView(DeleteView):
+    model = Company
+    success_url = '/done/'
+    related_summary = True
+    related_paginate_by = 2
+
+
+class RelatedPageTests(TestCase):
+
+    def setUp(self):
+        self.company = Company.objects.create(name='Acme')
+        for index in range(3):
+            Department.objects.create(company=self.company, name='Department {}'.format(index))
+
+    def get(self, **params):
+        request = make_request('get', data=params)
+        return CompanyDeleteView.as_view()(request, pk=self.company.pk)
+
+    def test_summary(self):
+        response = self.get()
+
+        summary = response.context_data['related_summary']
+        self.assertEqual([(item['label'], item['count']) for item in summary], [('benchmarks.department', 3)])
+
+    def test_paginated_related_page(self):
+        response = self.get(related='benchmarks.department', page=2)
+        response.render()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context_data['page_obj'].number, 2)
+        self.assertEqual(list(response.context_data['related_objects']),
+                         list(Department.objects.order_by('pk')[2:]))
+        self.assertIn(b'3 departments will be deleted', response.content)
+
+    def test_unknown_related_model(self):
+        with self.assertRaises(Http404):
+            self.get(related='benchmarks.nothing')
+
+    def test_invalid_page(self):
+        with self.assertRaises(Http404):
+            self.get(related='benchmarks.department', page=5)
+
+
+class CollectRelatedTests(TestCase):
+
+    def test_follows_every_level(self):
+        company = Company.objects.create(name='Acme')
+        department = Department.objects.create(company=company, name='Sales')
+        employee = Employee.objects.create(department=department, name='Employee', email='e@example.com',
+                                           hired='2020-01-01', salary='1000.00')
+        Task.objects.create(employee=employee, title='Task', due='2020-01-01')
+
+        collected = collect_related(Company.objects.filter(pk=company.pk))
+
+        self.assertEqual([(model, qs.count()) for model, qs in collected.items()],
+                         [(Department, 1), (Employee, 1), (Task, 1)])
+
+    def test_self_referential_relation_is_expanded(self):
+        root = Category.objects.create(name='root')
+        children = [Category.objects.create(parent=root, name='child {}'.format(i)) for i in range(2)]
+        grandchild = Category.objects.create(parent=children[0], name='grandchild')
+        Category.objects.create(parent=grandchild, name='great grandchild')
+        Category.objects.create(name='unrelated')
+
+        collected = collect_related(Category.objects.filter(pk=root.pk))
+
+        self.assertEqual(list(collected), [Category])
+        self.assertEqual(collected[Category].count(), 4)
+
+    def test_self_referential_expansion_respects_max_depth(self):
+        root = Category.objects.create(name='root')
+        child = Category.objects.create(parent=root, name='child')
+        grandchild = Category.objects.create(parent=child, name='grandchild')
+        Category.objects.create(parent=grandchild, name='great grandchild')
+
+        collected = collect_related(Category.objects.filter(pk=root.pk), max_depth=2)
+
+        self.assertEqual(set(collected[Category]), {child, grandchild})
+
+    def test_chunked_delete_of_a_tree(self):
+        root = Category.objects.create(name='root')
+        parent = root
+        for index in range(4):
+            parent = Category.objects.create(parent=parent, name='level {}'.format(index))
+        Category.objects.create(name='unrelated')
+
+        deleted = chunked_delete(Category.objects.filter(pk=root.pk), chunk_size=2)
+
+        self.assertEqual(deleted[Category], 5)
+        self.assertEqual(list(Category.objects.values_list('name', flat=True)), ['unrelated'])
@@ -0,0 +1,65 @@
+import json
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from benchmarks.models import Company, Department, Employee
+from benchmarks.views import EMPLOYEE_FIELDS
+from crudwrapper.views import CreateView
+
+from .utils import make_request
+
+
+class EmployeeForm(forms.ModelForm):
+
+    class Meta:
+        model = Employee
+        fields = EMPLOYEE_FIELDS
+
+    def clean(self):
+        cleaned_data = super(EmployeeForm, self).clean()
+        # an error on another field than the one it reads, like a Model.clean() can raise.
+        if cleaned_data.get('name') == 'Reserved':
+            raise ValidationError({'email': "Reserved employees use the team email."})
+        return cleaned_data
+
+
+class EmployeeCreateView(CreateView):
+    model = Employee
+    form_class = EmployeeForm
+    success_url = '/done/'
+    field_validation = True
+
+
+class FieldValidationTests(TestCase):
+
+    def setUp(self):
+        department = Department.objects.create(company=Company.objects.create(name='Acme'), name='Sales')
+        self.data = {'department': department.pk, 'name': 'Reserved', 'email': 'a@example.com',
+                     'hired': '2020-01-01', 'salary': '1000.00'}
+
+    def validate(self, fields, data):
+        request = make_request('post', path='/?validate={}'.format(fields), data=data)
+        response = EmployeeCreateView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content.decode('utf-8'))
+
+    def test_only_the_requested_errors_are_returned(self):
+        result = self.validate('name', self.data)
+
+        self.assertEqual(result, {'valid': True, 'errors': {}})
+        self.assertFalse(Employee.objects.exists())
+
+    def test_clean_errors_of_a_requested_field(self):
+        result = self.validate('name,email', self.data)
+
+        self.assertEqual(result, {'valid': False, 'errors': {'email': ["Reserved employees use the team email."]}})
+
+    def test_field_errors(self):
+        data = dict(self.data, email='not an email')
+
+        result = self.validate('email', data)
+
+        self.assertFalse(result['valid'])
+        self.assertEqual(list(result['errors']), ['email'])
@@ -0,0 +1,42 @@
+from django.db import connection
+from django.template import engines
+from django.template.response import TemplateResponse
+from django.test import TestCase
+from django.views.generic import View
+
+from benchmarks.models import Company
+from crudwrapper.instrumentation import InstrumentedViewMixin, MemorySink
+
+from .utils import make_request
+
+
+class CompanyListView(InstrumentedViewMixin, View):
+
+    def get(self, request):
+        Company.objects.count()
+        template = engines['django'].from_string('{% for company in companies %}{{ company.name }}{% endfor %}')
+        return TemplateResponse(request, template, {'companies': Company.objects.all()})
+
+
+class InstrumentedViewTests(TestCase):
+
+    def setUp(self):
+        Company.objects.create(name='Acme')
+        self.sink = MemorySink()
+
+    def get(self):
+        view = CompanyListView.as_view(instrumentation_sinks=(self.sink, ))
+        return view(make_request('get'))
+
+    def test_unrendered_response_removes_query_wrapper(self):
+        self.get()
+
+        self.assertEqual(connection.execute_wrappers, [])
+        self.assertEqual(self.sink.records, [])
+
+    def test_render_queries_reported(self):
+        response = self.get()
+        response.render()
+
+        self.assertEqual(connection.execute_wrappers, [])
+        self.assertEqual([stats['queries'] for stats in self.sink.records], [2])
@@ -0,0 +1,62 @@
+import json
+
+from django.test import TestCase
+try:
+    from django.urls import NoReverseMatch, reverse
+except ImportError:
+    from django.core.urlresolvers import NoReverseMatch, reverse
+
+from benchmarks.models import Company
+from crudwrapper.jobs import DONE, get_job
+from crudwrapper.views import DeleteView
+
+from .utils import make_request
+
+
+class RecordingExecutor(object):
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, func, *args):
+        self.submitted.append(args)
+        return func(*args)
+
+
+class CompanyDeleteView(DeleteView):
+    model = Company
+    success_url = '/done/'
+    background_job = True
+
+
+class BackgroundDeleteTests(TestCase):
+
+    def setUp(self):
+        self.company = Company.objects.create(name='Acme')
+        self.executor = RecordingExecutor()
+
+    def post(self, **initkwargs):
+        view = CompanyDeleteView.as_view(job_executor=self.executor, **initkwargs)
+        return view(make_request('post'), pk=self.company.pk)
+
+    def test_job_submitted_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.post()
+            self.assertEqual(self.executor.submitted, [])
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        job_id = json.loads(response.content.decode())['job_id']
+        self.assertEqual(response['Location'], reverse('crudwrapper_job_status', kwargs={'job_id': job_id}))
+        self.assertEqual(get_job(job_id)['status'], DONE)
+        self.assertFalse(Company.objects.filter(pk=self.company.pk).exists())
+
+    def test_missing_status_route_queues_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(NoReverseMatch):
+                self.post(job_status_url='missing_job_status')
+
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.executor.submitted, [])
+        self.assertTrue(Company.objects.filter(pk=self.company.pk).exists())
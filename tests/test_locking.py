@@ -0,0 +1,147 @@
+import datetime
+import json
+
+from django.core.exceptions import NON_FIELD_ERRORS
+from django.test import TestCase
+
+from benchmarks.models import Company, Department, Employee
+from benchmarks.views import EMPLOYEE_FIELDS
+from crudwrapper.views import ModelFormSetView, UpdateView
+
+from .utils import make_request
+
+
+class LockedEmployeeUpdateView(UpdateView):
+    model = Employee
+    fields = EMPLOYEE_FIELDS
+    success_url = '/done/'
+    version_field = 'version'
+
+
+class LockedEmployeeFormSetView(ModelFormSetView):
+    model = Employee
+    fields = EMPLOYEE_FIELDS
+    factory_kwargs = {'extra': 0}
+    success_url = '/done/'
+    version_field = 'version'
+
+
+def employee_data(employee, **values):
+    data = {
+        'department': employee.department_id,
+        'name': employee.name,
+        'email': employee.email,
+        'hired': employee.hired.isoformat(),
+        'salary': str(employee.salary),
+        'active': 'on' if employee.active else '',
+    }
+    data.update(values)
+    return data
+
+
+class LockingTestCase(TestCase):
+
+    def setUp(self):
+        company = Company.objects.create(name='Acme')
+        self.department = Department.objects.create(company=company, name='Sales')
+        self.employees = [
+            Employee.objects.create(department=self.department, name='Employee {}'.format(i),
+                                    email='employee{}@example.com'.format(i),
+                                    hired=datetime.date(2020, 1, 1), salary='1000.00')
+            for i in range(2)
+        ]
+
+
+class UpdateViewLockTests(LockingTestCase):
+
+    def post(self, employee, version, **values):
+        data = employee_data(employee, **values)
+        data['cw_version'] = version
+        request = make_request('post', data=data)
+        return LockedEmployeeUpdateView.as_view()(request, pk=employee.pk)
+
+    def test_matching_version_saves_and_bumps(self):
+        employee = self.employees[0]
+        response = self.post(employee, '0', name='Renamed')
+
+        self.assertEqual(response.status_code, 302)
+        employee.refresh_from_db()
+        self.assertEqual(employee.name, 'Renamed')
+        self.assertEqual(employee.version, 1)
+
+    def test_stale_version_is_a_form_error(self):
+        employee = self.employees[0]
+        Employee.objects.filter(pk=employee.pk).update(name='Changed elsewhere', version=1)
+
+        response = self.post(employee, '0', name='Renamed')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(NON_FIELD_ERRORS, response.context_data['form'].errors)
+        employee.refresh_from_db()
+        self.assertEqual(employee.name, 'Changed elsewhere')
+        self.assertEqual(employee.version, 1)
+
+    def test_rendered_version_is_the_current_one(self):
+        employee = self.employees[0]
+        Employee.objects.filter(pk=employee.pk).update(version=3)
+
+        request = make_request('get')
+        response = LockedEmployeeUpdateView.as_view()(request, pk=employee.pk)
+
+        self.assertEqual(response.context_data['version_param'], 'cw_version')
+        self.assertEqual(response.context_data['version_token'], '3')
+
+
+class FormSetLockTests(LockingTestCase):
+
+    def post(self, versions, changes=None):
+        changes = changes or {}
+        data = {
+            'form-TOTAL_FORMS': str(len(self.employees)),
+            'form-INITIAL_FORMS': str(len(self.employees)),
+            'form-MIN_NUM_FORMS': '0',
+            'form-MAX_NUM_FORMS': '1000',
+            'cw_version': json.dumps(versions),
+        }
+        for index, employee in enumerate(self.employees):
+            values = employee_data(employee, **changes.get(employee.pk, {}))
+            values['id'] = employee.pk
+            data.update(('form-{}-{}'.format(index, name), value) for name, value in values.items())
+        request = make_request('post', data=data)
+        return LockedEmployeeFormSetView.as_view()(request)
+
+    def test_changed_rows_are_saved_and_bumped(self):
+        first, second = self.employees
+        response = self.post({str(first.pk): '0', str(second.pk): '0'},
+                             {first.pk: {'name': 'Renamed'}})
+
+        self.assertEqual(response.status_code, 302)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.name, first.version), ('Renamed', 1))
+        self.assertEqual(second.version, 0)
+
+    def test_stale_rows_get_an_error(self):
+        first, second = self.employees
+        Employee.objects.filter(pk=first.pk).update(version=1)
+
+        response = self.post({str(first.pk): '0', str(second.pk): '0'},
+                             {first.pk: {'name': 'Renamed'}, second.pk: {'name': 'Also renamed'}})
+
+        self.assertEqual(response.status_code, 200)
+        forms = response.context_data['formset'].forms
+        self.assertTrue(forms[0].non_field_errors())
+        self.assertFalse(forms[1].non_field_errors())
+        # the whole formset is refused, the fresh row isn't saved either.
+        self.assertFalse(Employee.objects.filter(name__in=['Renamed', 'Also renamed']).exists())
+        self.assertEqual(list(Employee.objects.order_by('pk').values_list('version', flat=True)), [1, 0])
+
+    def test_unchanged_stale_rows_are_ignored(self):
+        first, second = self.employees
+        Employee.objects.filter(pk=second.pk).update(version=1)
+
+        response = self.post({str(first.pk): '0', str(second.pk): '0'},
+                             {first.pk: {'name': 'Renamed'}})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Employee.objects.get(pk=first.pk).name, 'Renamed')
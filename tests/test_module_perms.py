@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.views.generic import View
+
+from crudwrapper.mixins import ModulePermRequiredMixin
+
+from .utils import make_request
+
+
+class BenchmarksModuleView(ModulePermRequiredMixin, View):
+    module_name = 'benchmarks'
+    module_perms_cache_timeout = 300
+
+
+class AppLabelBackend(object):
+    """
+    A backend that only answers module checks, e.g. an LDAP group mapping.
+    """
+
+    def authenticate(self, request, **credentials):
+        return None
+
+    def has_module_perms(self, user, app_label):
+        return app_label == 'benchmarks'
+
+
+class ModulePermsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        # makes sure the group and the user don't share a pk.
+        Group.objects.create(name='unused')
+        self.group = Group.objects.create(name='editors')
+        self.user = get_user_model().objects.create_user('alice', password='secret')
+        self.user.groups.add(self.group)
+        self.assertNotEqual(self.group.pk, self.user.pk)
+        self.permission = Permission.objects.get(content_type__app_label='benchmarks', codename='change_employee')
+
+    def check(self, view_class=BenchmarksModuleView):
+        # a fresh user, the auth backend caches the permissions on the instance.
+        user = get_user_model().objects.get(pk=self.user.pk)
+        view = view_class()
+        view.request = make_request('get', user=user)
+        return view.test_func(user)
+
+    def test_result_is_cached(self):
+        self.assertFalse(self.check())
+        # sends no m2m_changed signal, so the cached result stays.
+        self.user.user_permissions.through.objects.create(user=self.user, permission=self.permission)
+
+        self.assertFalse(self.check())
+
+    def test_group_permission_change_invalidates(self):
+        self.assertFalse(self.check())
+
+        self.group.permissions.add(self.permission)
+        self.assertTrue(self.check())
+
+        self.group.permissions.remove(self.permission)
+        self.assertFalse(self.check())
+
+    def test_group_membership_change_invalidates(self):
+        self.group.permissions.add(self.permission)
+        self.assertTrue(self.check())
+
+        self.group.user_set.remove(self.user)
+        self.assertFalse(self.check())
+
+    def test_user_permission_change_invalidates(self):
+        self.assertFalse(self.check())
+
+        self.user.user_permissions.add(self.permission)
+        self.assertTrue(self.check())
+
+    def test_multiple_modules(self):
+        class MultiModuleView(BenchmarksModuleView):
+            module_name = ['benchmarks', 'tests']
+
+        self.group.permissions.add(self.permission)
+        self.assertFalse(self.check(MultiModuleView))
+
+        MultiModuleView.module_perms_any = True
+        self.assertTrue(self.check(MultiModuleView))
+
+    @override_settings(AUTHENTICATION_BACKENDS=['tests.test_module_perms.AppLabelBackend'])
+    def test_backends_answer_module_checks(self):
+        class MultiModuleView(BenchmarksModuleView):
+            module_name = ['benchmarks', 'tests']
+            module_perms_any = True
+            module_perms_cache_timeout = None
+
+        self.assertTrue(self.check())
+        self.assertTrue(self.check(MultiModuleView))
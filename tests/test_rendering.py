@@ -0,0 +1,46 @@
+import re
+
+from django.forms.models import modelformset_factory
+from django.test import TestCase
+
+from crispy_forms.utils import render_crispy_form
+
+from benchmarks.data import make_company
+from benchmarks.models import Employee
+from benchmarks.views import EMPLOYEE_FIELDS
+from crudwrapper.forms import CrispyModelForm, CrispyFormSetHelper
+from crudwrapper.rendering import get_skeleton_key, render_form, render_formset, skeleton_cache
+
+
+def normalize(html):
+    return re.sub(r'\s+', ' ', str(html)).strip()
+
+
+class RenderFormSetTest(TestCase):
+
+    def setUp(self):
+        skeleton_cache.clear()
+        make_company(departments=1, employees=3)
+        self.formset_class = modelformset_factory(
+            Employee, form=CrispyModelForm, fields=EMPLOYEE_FIELDS, extra=1, can_delete=True)
+        self.helper = CrispyFormSetHelper()
+
+    def get_formset(self):
+        return self.formset_class(queryset=Employee.objects.order_by('pk'))
+
+    def test_formset_forms_use_cached_skeleton(self):
+        formset = self.get_formset()
+        render_formset(formset, self.helper)
+        for form in formset:
+            skeleton = skeleton_cache.get(get_skeleton_key(form, self.helper))
+            self.assertIsNotNone(skeleton)
+            self.assertIsNotNone(skeleton.html)
+            self.assertIn('id', skeleton.widget_attrs)
+            self.assertIn('DELETE', skeleton.widget_attrs)
+
+    def test_formset_forms_render_like_crispy(self):
+        formset, expected = self.get_formset(), self.get_formset()
+        render_formset(formset, self.helper)  # fills the cache.
+        for index, (form, expected_form) in enumerate(zip(formset, expected)):
+            self.assertEqual(normalize(render_form(form, self.helper, None, formset, index)),
+                             normalize(render_crispy_form(expected_form, self.helper)))
@@ -0,0 +1,9 @@
+try:
+    from django.urls import include, re_path as url
+except ImportError:
+    from django.conf.urls import include, url
+
+
+urlpatterns = [
+    url(r'^', include('benchmarks.urls')),
+]
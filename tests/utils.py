@@ -0,0 +1,21 @@
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.test import AsyncRequestFactory, RequestFactory
+
+
+def make_request(method, path='/', data=None, user=None, factory=RequestFactory):
+    """
+    A request with a session and message storage, for calling views directly.
+    """
+    request = getattr(factory(), method.lower())(path, data or {})
+    request.session = import_module(settings.SESSION_ENGINE).SessionStore()
+    request._messages = FallbackStorage(request)
+    request.user = user if user is not None else AnonymousUser()
+    return request
+
+
+def make_async_request(method, path='/', data=None, user=None):
+    return make_request(method, path, data, user, factory=AsyncRequestFactory)